@@ -0,0 +1,159 @@
+#----------------------------------------------------------------------------#
+# Read-only JSON API, /api/v1.
+#
+# Built on the same serializers as the HTML pages (Venue.serialize,
+# Artist.serialize, Show.row_details). Every endpoint takes
+# ?fields=id,name,... to return only those keys; list endpoints page with
+# ?cursor=...&limit=... like the HTML listings, and /shows takes the
+# filters of the /shows page (when, from, to, city, state, genre, ...).
+# Responses are encoded with orjson when it is installed.
+#----------------------------------------------------------------------------#
+
+import json
+
+from flask import Blueprint, Response, abort, current_app, request, url_for
+from werkzeug.exceptions import HTTPException
+
+from helpers import page_args
+from models import Artist, Show, Venue, db, paginate, show_filters
+
+try:
+    import orjson
+except ImportError:  # optional dependency, the stdlib encoder is used without it
+    orjson = None
+
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+ENTITY_FIELDS = {
+    'venues': ('id', 'name', 'genres', 'city', 'state', 'address', 'phone', 'website', 'facebook_link',
+               'seeking_talent', 'seeking_description', 'image_link', 'num_upcoming_shows', 'num_past_shows'),
+    'artists': ('id', 'name', 'genres', 'city', 'state', 'phone', 'website', 'facebook_link',
+                'seeking_venue', 'seeking_description', 'image_link', 'num_upcoming_shows', 'num_past_shows'),
+}
+DETAIL_FIELDS = ('upcoming_shows', 'upcoming_shows_count', 'past_shows', 'past_shows_count')
+SHOW_FIELDS = ('id', 'venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link', 'start_time')
+SEARCH_FIELDS = ('id', 'name', 'num_upcoming_shows', 'score')
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':'), default=str)
+
+
+def json_response(data, status=200):
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def fieldset(allowed):
+    """The keys requested with ?fields=, or None for all of them."""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        abort(400, f'Unknown fields {", ".join(unknown)}; available: {", ".join(allowed)}')
+    return fields
+
+
+def select(item, fields):
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields}
+
+
+def page_response(items, fields, next_cursor, limit):
+    args = dict(request.args, cursor=next_cursor, limit=limit)
+    return json_response({
+        'data': [select(item, fields) for item in items],
+        'next_cursor': next_cursor,
+        'next': url_for(request.endpoint, **args) if next_cursor else None,
+    })
+
+
+def entity_summary(entity):
+    summary = entity.serialize
+    summary['num_upcoming_shows'] = entity.upcoming_shows_count
+    summary['num_past_shows'] = entity.past_shows_count
+    return summary
+
+
+def entity_list(model, kind):
+    fields = fieldset(ENTITY_FIELDS[kind])
+    cursor, limit = page_args()
+    # genres for the whole page in one extra statement
+    query = model.query.options(db.selectinload(model.genres))
+    entities, next_cursor = paginate(query, (model.id,), cursor, limit)
+    return page_response([entity_summary(entity) for entity in entities], fields, next_cursor, limit)
+
+
+def entity_detail(model, kind, id):
+    fields = fieldset(ENTITY_FIELDS[kind] + DETAIL_FIELDS)
+    details = model.get_by_id_full(id)
+    details['num_upcoming_shows'] = details['upcoming_shows_count']
+    details['num_past_shows'] = details['past_shows_count']
+    return json_response(select(details, fields))
+
+
+def entity_search(search):
+    fields = fieldset(SEARCH_FIELDS)
+    term = request.args.get('q', '')
+    results = search(term, current_app.config['SEARCH_LIMIT'])
+    return json_response({'data': [select(result, fields) for result in results], 'count': len(results)})
+
+
+# the app's HTML handlers for 404 and 500 would win over a class-wide one
+@api.errorhandler(404)
+@api.errorhandler(500)
+@api.errorhandler(HTTPException)
+def http_error(error):
+    return json_response({'error': error.name, 'message': error.description}, error.code)
+
+
+@api.route('/venues')
+def venues():
+    return entity_list(Venue, 'venues')
+
+
+@api.route('/venues/search')
+def search_venues():
+    return entity_search(Venue.name_search)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return entity_detail(Venue, 'venues', venue_id)
+
+
+@api.route('/artists')
+def artists():
+    return entity_list(Artist, 'artists')
+
+
+@api.route('/artists/search')
+def search_artists():
+    return entity_search(Artist.search_artist_name)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return entity_detail(Artist, 'artists', artist_id)
+
+
+@api.route('/shows')
+def shows():
+    fields = fieldset(SHOW_FIELDS)
+    cursor, limit = page_args()
+    shows, next_cursor = Show.get_page(cursor, limit, Show.window(**show_filters(request.args)))
+    return page_response(shows, fields, next_cursor, limit)
+
+
+@api.route('/shows/<int:show_id>')
+def show(show_id):
+    fields = fieldset(SHOW_FIELDS)
+    row = Show.details_query().filter(Show.id == show_id).first()
+    if row is None:
+        abort(404)
+    return json_response(select(Show.row_details(row), fields))
@@ -2,412 +2,216 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-import json
-import dateutil.parser
-import babel
-import sys
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from models import  Artist,Venue,Show, Genre, ArtistGenre, VenueGenre, db
+import os
+import babel.dates
+import click
+from sqlalchemy import exc
+from datetime import datetime
+from functools import lru_cache
+from jinja2 import FileSystemBytecodeCache
+from flask import Flask, render_template, request, Response, jsonify, stream_with_context, current_app
+from models import db
+from extensions import moment, instrumentation, query_detector, response_cache
+from database import LoadTimeout, configure_database, ping, pool_stats
+from jobs import jobs
+from exporter import MIMETYPES, InvalidExport, check, export_chunks
+from helpers import run_import
 
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
+
+# The app is built by create_app() rather than at import time. The page
+# blueprints, WTForms (through forms.py) and Flask-Migrate are imported
+# when the app or the view that needs them is created, so a worker only
+# pays for what it serves. `python bench_startup.py` reports where the
+# import time goes.
+
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
+def create_app(config='config', **settings):
+  app = Flask(__name__)
+  app.config.from_object(config)
+  app.config.update(settings)
+  configure_database(app)
+  db.init_app(app)
+  moment.init_app(app)
+  instrumentation.init_app(app)
+  query_detector.init_app(app)
+  response_cache.init_app(app)
+  jobs.init_app(app)
+  instrumentation.gauge('job_queue_depth', jobs.depth)
+  instrumentation.gauge('job_dead_letters', jobs.dead_count)
+  instrumentation.collector(lambda: pool_stats.lines(
+    {name or 'primary': engine for name, engine in db.engines.items()},
+    app.config['DB_POOL_SIZE'] + app.config['DB_MAX_OVERFLOW']
+  ))
+
+  import venues, artists, shows
+  from api import api
+  from commands import register_commands
+
+  app.add_url_rule('/', view_func=index)
+  app.register_blueprint(venues.blueprint)
+  app.register_blueprint(artists.blueprint)
+  app.register_blueprint(shows.blueprint)
+  app.add_url_rule('/import/<kind>', view_func=import_data, methods=['POST'])
+  app.add_url_rule('/export/<kind>', view_func=export_data)
+  app.add_url_rule('/healthz', view_func=healthz)
+  app.register_blueprint(api)
+
+  app.register_error_handler(404, not_found_error)
+  app.register_error_handler(500, server_error)
+  app.register_error_handler(exc.TimeoutError, database_unavailable)
+  app.register_error_handler(exc.OperationalError, database_unavailable)
+  app.register_error_handler(LoadTimeout, database_unavailable)
+
+  register_commands(app)
+  # `flask db ...` is the only user of Flask-Migrate (and Alembic), so only
+  # the flask command line loads it
+  if click.get_current_context(silent=True) is not None:
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
+  app.jinja_env.filters['datetime'] = format_datetime
+  # compiled templates are kept on disk, so a restarted process loads them
+  # instead of compiling every template again
+  os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+  app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+  if app.config['TEMPLATE_WARMUP']:
+    warm_templates(app)
+
+  if not app.debug and not app.testing:
+    file_handler = FileHandler('error.log')
+    file_handler.setFormatter(
+        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    )
+    app.logger.setLevel(logging.INFO)
+    file_handler.setLevel(logging.INFO)
+    app.logger.addHandler(file_handler)
+    app.logger.info('errors')
 
-# TODO: connect to a local postgresql database
+  return app
 
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+# babel's own format names, e.g. 'short'; the locale picks their patterns
+BABEL_FORMATS = ('short', 'medium', 'long', 'full')
+DATETIME_LOCALE = babel.Locale.parse(babel.dates.LC_TIME or 'en_US')
+
+@lru_cache(maxsize=None)
+def datetime_pattern(pattern):
+  return babel.dates.parse_pattern(pattern)
+
+def parse_datetime(value):
+  # Show.row_details() formats start times like this; dateutil guesses
+  # any other format, much more slowly
+  try:
+    return datetime.strptime(value, "%m/%d/%Y, %H:%M")
+  except ValueError:
+    import dateutil.parser
+    return dateutil.parser.parse(value)
+
 def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+  if not isinstance(value, datetime):
+    value = parse_datetime(value)
+  format = DATETIME_FORMATS.get(format, format)
+  if format in BABEL_FORMATS:
+    return babel.dates.format_datetime(value, format, locale=DATETIME_LOCALE)
+  return datetime_pattern(format).apply(value, DATETIME_LOCALE)
+
+
+#----------------------------------------------------------------------------#
+# Templates.
+#----------------------------------------------------------------------------#
 
-app.jinja_env.filters['datetime'] = format_datetime
+def warm_templates(app):
+  # load every template now rather than on the first request that renders it
+  names = app.jinja_env.list_templates(extensions=['html'])
+  for name in names:
+    app.jinja_env.get_template(name)
+  return names
 
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
+# venues, artists and shows are blueprints in venues.py, artists.py and
+# shows.py; the JSON API is in api.py
+
 def index():
   return render_template('pages/home.html')
 
-#------------------------------------------------------------------#
-#  Venues
-#  ----------------------------------------------------------------#
-
-@app.route('/venues')
-def venues():
-  # TODO: replace with real venues data.
-  #       num_shows should be aggregated based on number of upcoming shows per venue.
-  data = Venue.get_all()
-  return render_template('pages/venues.html', areas=data);
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for Hop should return "The Musical Hop".
-  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
- 
-    search_term = request.form.get('search_term')
-    search_results = Venue.name_search(search_term)
-    response = {
-        'count': len(search_results),
-        'data': search_results
-    }
-
-    return render_template('pages/search_venues.html', results=response,search_term=request.form.get('search_term', ''))
-
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-  # shows the venue page with the given venue_id
-  # TODO: replace with real venue data from the venues table, using venue_id
-  data1={
-    "id": 1,
-    "name": "The Musical Hop",
-    "genres": ["Jazz", "Reggae", "Swing", "Classical", "Folk"],
-    "address": "1015 Folsom Street",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "123-123-1234",
-    "website": "https://www.themusicalhop.com",
-    "facebook_link": "https://www.facebook.com/TheMusicalHop",
-    "seeking_talent": True,
-    "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
-    "image_link": "https://images.unsplash.com/photo-1543900694-133f37abaaa5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=400&q=60",
-    "past_shows": [{
-      "artist_id": 4,
-      "artist_name": "Guns N Petals",
-      "artist_image_link": "https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80",
-      "start_time": "2019-05-21T21:30:00.000Z"
-    }],
-    "upcoming_shows": [],
-    "past_shows_count": 1,
-    "upcoming_shows_count": 0,
-  }
-  data2={
-    "id": 2,
-    "name": "The Dueling Pianos Bar",
-    "genres": ["Classical", "R&B", "Hip-Hop"],
-    "address": "335 Delancey Street",
-    "city": "New York",
-    "state": "NY",
-    "phone": "914-003-1132",
-    "website": "https://www.theduelingpianos.com",
-    "facebook_link": "https://www.facebook.com/theduelingpianos",
-    "seeking_talent": False,
-    "image_link": "https://images.unsplash.com/photo-1497032205916-ac775f0649ae?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=750&q=80",
-    "past_shows": [],
-    "upcoming_shows": [],
-    "past_shows_count": 0,
-    "upcoming_shows_count": 0,
-  }
-  data3={
-    "id": 3,
-    "name": "Park Square Live Music & Coffee",
-    "genres": ["Rock n Roll", "Jazz", "Classical", "Folk"],
-    "address": "34 Whiskey Moore Ave",
-    "city": "San Francisco",
-    "state": "CA",
-    "phone": "415-000-1234",
-    "website": "https://www.parksquarelivemusicandcoffee.com",
-    "facebook_link": "https://www.facebook.com/ParkSquareLiveMusicAndCoffee",
-    "seeking_talent": False,
-    "image_link": "https://images.unsplash.com/photo-1485686531765-ba63b07845a7?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=747&q=80",
-    "past_shows": [{
-      "artist_id": 5,
-      "artist_name": "Matt Quevedo",
-      "artist_image_link": "https://images.unsplash.com/photo-1495223153807-b916f75de8c5?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=334&q=80",
-      "start_time": "2019-06-15T23:00:00.000Z"
-    }],
-    "upcoming_shows": [{
-      "artist_id": 6,
-      "artist_name": "The Wild Sax Band",
-      "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-      "start_time": "2035-04-01T20:00:00.000Z"
-    }, {
-      "artist_id": 6,
-      "artist_name": "The Wild Sax Band",
-      "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-      "start_time": "2035-04-08T20:00:00.000Z"
-    }, {
-      "artist_id": 6,
-      "artist_name": "The Wild Sax Band",
-      "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-      "start_time": "2035-04-15T20:00:00.000Z"
-    }],
-    "past_shows_count": 1,
-    "upcoming_shows_count": 1,
-  }
- 
-  data = Venue.get_by_id_full(venue_id)
-  return render_template('pages/show_venue.html', venue=data)
-
-#  Create Venue
+#  Import
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
-def create_venue_form():
-  form = VenueForm()
-  return render_template('forms/new_venue.html', form=form)
-
-@app.route('/venues/create', methods=['POST'])
-def create_venue_submission():
-  # TODO: insert form data as a new Venue record in the db, instead
-  # TODO: modify data to be the data object returned from db insertion
+def import_data(kind):
+  from importer import InvalidImport, detect_format, text_stream
 
-  # on successful db insert, flash success
-  # flash('Venue ' + request.form['name'] + ' was successfully listed!')
-  # TODO: on unsuccessful db insert, flash an error instead.
-  # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
-  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-  # return render_template('pages/home.html')
-
-    try:
-      name = request.form['name']
-      city = request.form['city']
-      state = request.form['state']
-      address = request.form['address']
-      phone = request.form['phone']
-      image_link = request.form['image_link']
-      facebook_link = request.form['facebook_link']
-      venue = Venue(name = name,city=city,state=state,address=address,phone=phone, image_link=image_link, facebook_link=facebook_link)
-      db.session.add(venue)
-      db.session.commit()
-
-      flash('Venue ' + request.form['name'] + ' was successfully listed!')
-    except:
-      db.session.rollback()
-      flash('An error occurred. Venue could not be listed.')
-
-    finally:
-      db.session.close()
-      return render_template('pages/home.html')
-
-
-@app.route('/venues/<venue_id>', methods=['DELETE'])
-def delete_venue(venue_id):
-  # TODO: Complete this endpoint for taking a venue_id, and using
-  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
-
-  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
-  # clicking that button delete it from the db then redirect the user to the homepage
-  return None
-
-#  Artists
-#  ----------------------------------------------------------------
-@app.route('/artists')
-def artists():
-  # TODO: replace with real data returned from querying the database
-
-  return render_template('pages/artists.html', artists=Artist.query.all())
-
-@app.route('/artists/search', methods=['POST'])
-def search_artists():
-  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
-  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
-  # search for "band" should return "The Wild Sax Band".
-  search_term = request.form.get('search_term')
-  artists = Artist.search_artist_name(search_term)
-
-  response = {
-      "count": len(artists),
-      "data": artists
-  }
-  return render_template('pages/search_artists.html', results=response,
-                          search_term=request.form.get('search_term', ''))
-
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-  # shows the venue page with the given venue_id
-  # TODO: replace with real venue data from the venues table, using venue_id
-  data = Artist.get_by_id_full(artist_id)
-  return render_template('pages/show_artist.html', artist=data)
-  
-#  Update
+  # a CSV or NDJSON upload in the "file" field, or as the raw request body
+  upload = request.files.get('file')
+  try:
+    if upload is not None:
+      report = run_import(kind, text_stream(upload.stream), detect_format(upload.filename, request.args.get('format')))
+    else:
+      report = run_import(kind, text_stream(request.stream), detect_format(None, request.args.get('format')))
+  except InvalidImport as error:
+    return jsonify({'error': str(error)}), 400
+  return jsonify(report)
+
+#  Export
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
-def edit_artist(artist_id):
-  artist = Artist.get_by_id(artist_id).serialize
-
-  # set current genres
-  artist['genres'] = ArtistGenre.get_genres_ids(artist_id)
-
-  form = ArtistForm(**artist)
-  form.genres.choices = Genre.get_enum()
-
-  return render_template('forms/edit_artist.html', form=form, artist=artist)
- 
-  # TODO: populate form with fields from artist with ID <artist_id>
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
-def edit_artist_submission(artist_id):
-  # TODO: take values from the form submitted, and update existing
-  # artist record with ID <artist_id> using the new attribute
-  form=ArtistForm()
+def export_data(kind):
+  format = request.args.get('format', 'csv')
   try:
-      artist = Artist.query.get(artist_id)
-      artist.name = request.form['name']
-      artist.city = request.form['city']
-      artist.state = request.form['state']
-      artist.phone = request.form['phone']
-      artist.image_link = request.form['image_link']
-      artist.facebook_link = request.form['facebook_link']
-      artist.website = request.form['website']
-      artist.seeking_venue=request.form['seeking_venue']
-      artist.seeking_description=request.form['seeking_description']
-      updated_genres = request.form['genres']
-
-      # Delete genres that are not in updated_genres
-      ArtistGenre.delete_old(artist_id=artist_id, genres=updated_genres)
-      # update venue genres
-      artist.update_genres(updated_genres)
-      db.session.commit()
-  except:
-      print(sys.exc_info())
-      db.session.rollback()
-
-  finally:
-      db.session.close()
-
-  return redirect(url_for('show_artist', artist_id=artist_id))
-  return redirect(url_for('show_artist', artist_id=artist_id))
-
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
-def edit_venue(venue_id):
-  venue = Venue.get_by_id(venue_id)
-  form = VenueForm(**venue)
-  # set current genres
-  venue['genres'] = VenueGenre.get_genres_ids(venue_id)
-  #  set genres list
-  form.genres.choices = Genre.get_enum()
-
-  return render_template('forms/edit_venue.html', form=form, venue=venue)
-
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
-def edit_venue_submission(venue_id):
-  # TODO: take values from the form submitted, and update existing
-  # venue record with ID <venue_id> using the new attributes
-  return redirect(url_for('show_venue', venue_id=venue_id))
-
-#  Create Artist
+    check(kind, format)
+  except InvalidExport as error:
+    return jsonify({'error': str(error)}), 400
+  chunks = export_chunks(kind, format, current_app.config['EXPORT_BATCH_SIZE'])
+  response = Response(stream_with_context(chunks), mimetype=MIMETYPES[format])
+  response.headers['Content-Disposition'] = f'attachment; filename={kind}.{format}'
+  return response
+
+#  Health
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
-def create_artist_form():
-  form = ArtistForm()
-  return render_template('forms/new_artist.html', form=form)
-
-@app.route('/artists/create', methods=['POST'])
-def create_artist_submission():
-  # called upon submitting the new artist listing form
-  # TODO: insert form data as a new Venue record in the db, instead
-  name = request.form['name']
-  city = request.form['city']
-  state = request.form['state']
-  phone = request.form['phone']
-  image_link = request.form['image_link']
-  facebook_link = request.form['facebook_link']
-  genres=request.form['genres']
-  new_artist = Artist(name = name,city=city,state=state,phone=phone, image_link=image_link, facebook_link=facebook_link)
-  db.session.add(new_artist)
-  db.session.commit()
-  # TODO: modify data to be the data object returned from db insertion
-
-  # on successful db insert, flash success
-  flash('Artist ' + request.form['name'] + ' was successfully listed!')
-  # TODO: on unsuccessful db insert, flash an error instead.
-  # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
-  return render_template('pages/home.html')
-
-
-#  Shows
+def healthz():
+  # pings the primary and the replica, so a load balancer can stop
+  # routing here while the database is unreachable
+  status = {}
+  for name, engine in db.engines.items():
+    try:
+      ping(engine)
+      status[name or 'primary'] = 'ok'
+    except exc.SQLAlchemyError as error:
+      status[name or 'primary'] = str(getattr(error, 'orig', None) or error)
+  healthy = all(value == 'ok' for value in status.values())
+  return jsonify(status), 200 if healthy else 503
+
+#  Errors
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
-def shows():
-  # displays list of shows at /shows
-  # TODO: replace with real venues data.
-  #       num_shows should be aggregated based on number of upcoming shows per venue.
-  data = Show.get_all()
-  return render_template('pages/shows.html', shows=data)
- 
-
-@app.route('/shows/create')
-def create_shows():
-  # renders form. do not touch.
-  form = ShowForm()
-  return render_template('forms/new_show.html', form=form)
-
-@app.route('/shows/create', methods=['POST'])
-def create_show_submission():
-  # called to create new shows in the db, upon submitting new show listing form
-  # TODO: insert form data as a new Show record in the db, instead
-    try:
-      artist_id = request.form['artist_id']
-      venue_id = request.form['venue_id']
-      start_time = request.form['start_time']
-      show = Show(artist_id = artist_id,venue_id=venue_id,start_time=start_time)
-      db.session.add(show)
-      db.session.commit()
-      
-      # return render_template('pages/shows.html')
-      flash('You have added a new show')
-
-    except:
-      db.session.rollback()
-      flash('An error occurred. Show could not be listed.')
-      print('failed')
-
-    finally:
-      db.session.close()
-  
-      return render_template('pages/home.html')
-      print('the final statement in try catch')
-  # on successful db insert, flash success
-  # flash('Show was successfully listed!')
-  # TODO: on unsuccessful db insert, flash an error instead.
-  # e.g., flash('An error occurred. Show could not be listed.')
-  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
-  # return render_template('pages/home.html')
-
-@app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
-
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+# no free pooled connection within DB_POOL_TIMEOUT, the database is
+# unreachable or a page's loads ran past DETAIL_TIMEOUT: ask the client to
+# come back instead of failing hard
+def database_unavailable(error):
+    return render_template('errors/500.html'), 503, {'Retry-After': '5'}
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -415,11 +219,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
@@ -0,0 +1,162 @@
+#----------------------------------------------------------------------------#
+# Artist pages.
+#
+# Listing, search, detail, create and edit pages of artists, and their
+# calendar feeds. The forms are imported by the views that use them.
+#----------------------------------------------------------------------------#
+
+import sys
+
+from flask import Blueprint, render_template, request, flash, redirect, url_for
+
+from extensions import response_cache
+from helpers import (calendar_response, conditional, evict_artist_pages, evict_pages, expire_at_next_show,
+                     next_page_url, notify, page_args)
+from jobs import jobs
+from models import Artist, Genre, UnknownGenres, db
+
+
+blueprint = Blueprint('artists', __name__)
+
+#  Artists
+#  ----------------------------------------------------------------
+@blueprint.route('/artists')
+@response_cache.cached('artists')
+def artists():
+  # TODO: replace with real data returned from querying the database
+
+  cursor, limit = page_args()
+  data, next_cursor = Artist.get_page(cursor, limit)
+  return render_template('pages/artists.html', artists=data, next_url=next_page_url(next_cursor, limit))
+
+@blueprint.route('/artists/search', methods=['POST'])
+def search_artists():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  search_term = request.form.get('search_term')
+  artists = Artist.search_artist_name(search_term)
+
+  response = {
+      "count": len(artists),
+      "data": artists
+  }
+  return render_template('pages/search_artists.html', results=response,
+                          search_term=request.form.get('search_term', ''))
+
+@blueprint.route('/artists/<int:artist_id>')
+@conditional(lambda artist_id: Artist.page_validators(artist_id))
+@response_cache.cached('artist:{artist_id}')
+def show_artist(artist_id):
+  # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id
+  data = Artist.get_by_id_full(artist_id)
+  expire_at_next_show(data)
+  return render_template('pages/show_artist.html', artist=data)
+  
+#  Update
+#  ----------------------------------------------------------------
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+
+  # artist with its current genres
+  artist = Artist.get_for_edit(artist_id)
+
+  form = ArtistForm(**artist)
+  form.genres.choices = Genre.get_enum()
+
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+ 
+  # TODO: populate form with fields from artist with ID <artist_id>
+
+@blueprint.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  from forms import ArtistForm
+
+  # TODO: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attribute
+  form=ArtistForm()
+  try:
+      genre_ids = Genre.resolve_ids(request.form.getlist('genres'))
+  except UnknownGenres as error:
+      flash(str(error))
+      return redirect(url_for('artists.edit_artist', artist_id=artist_id))
+
+  try:
+      artist = Artist.query.get(artist_id)
+      artist.name = request.form['name']
+      artist.city = request.form['city']
+      artist.state = request.form['state']
+      artist.phone = request.form['phone']
+      artist.image_link = request.form['image_link']
+      artist.facebook_link = request.form['facebook_link']
+      artist.website = request.form['website']
+      # an unchecked checkbox isn't posted at all
+      artist.seeking_venue = 'seeking_venue' in request.form
+      artist.seeking_description=request.form['seeking_description']
+
+      # replace the artist's genres with the selected ones
+      artist.update_genres(genre_ids)
+      db.session.commit()
+      jobs.submit(evict_artist_pages, artist_id)
+      notify('artist.updated', {'id': artist_id})
+  except:
+      print(sys.exc_info())
+      db.session.rollback()
+
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+  return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@blueprint.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  from forms import ArtistForm
+
+  # called upon submitting the new artist listing form
+  # TODO: insert form data as a new Venue record in the db, instead
+  try:
+    genre_ids = Genre.resolve_ids(request.form.getlist('genres'))
+  except UnknownGenres as error:
+    flash(str(error))
+    return render_template('forms/new_artist.html', form=ArtistForm())
+
+  name = request.form['name']
+  city = request.form['city']
+  state = request.form['state']
+  phone = request.form['phone']
+  image_link = request.form['image_link']
+  facebook_link = request.form['facebook_link']
+  new_artist = Artist(name = name,city=city,state=state,phone=phone, image_link=image_link, facebook_link=facebook_link)
+  db.session.add(new_artist)
+  db.session.flush()
+  new_artist.update_genres(genre_ids)
+  created = {'id': new_artist.id, 'name': name}
+  db.session.commit()
+  jobs.submit(evict_pages, 'artists')
+  notify('artist.created', created)
+  # TODO: modify data to be the data object returned from db insertion
+
+  # on successful db insert, flash success
+  flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+  return render_template('pages/home.html')
+
+#  Calendar
+#  ----------------------------------------------------------------
+
+@blueprint.route('/artists/<int:artist_id>/calendar.<any(ics, json):format>')
+@response_cache.cached('artist:{artist_id}')
+def artist_calendar(artist_id, format):
+  artist = Artist.query.get_or_404(artist_id)
+  return calendar_response(artist.name, format, artist_id=artist_id)
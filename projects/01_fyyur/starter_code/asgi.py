@@ -0,0 +1,171 @@
+#----------------------------------------------------------------------------#
+# Async serving of the read pages.
+#
+#   $ uvicorn --factory asgi:create_app
+#
+# An ASGI app around the Flask app. The listing, detail, search and
+# calendar pages (ASYNC_ENDPOINTS) run on the event loop: each request runs
+# the unchanged Flask view in a greenlet, and its queries go to the 'async'
+# bind (asyncpg, or aiosqlite locally, see database.py), which hands every
+# wait on the database back to the loop. This is how SQLAlchemy's asyncio
+# extension runs its own ORM code (AsyncSession.run_sync), so one process
+# keeps as many of these requests in flight as the async pool allows. The
+# app itself never uses AsyncEngine or AsyncSession: the 'async' bind is a
+# plain Engine on an async dialect, which works inside greenlet_spawn.
+#
+# /healthz runs on the loop as well; database.ping() checks the sync
+# engines from a thread, so a slow primary or replica doesn't stall it.
+#
+# The other routes (forms, writes, imports, exports) may block on files,
+# webhooks and the job queue; they keep the synchronous engines and run in
+# the loop's thread pool.
+#----------------------------------------------------------------------------#
+
+import asyncio
+import contextvars
+import io
+import sys
+
+from sqlalchemy.util import greenlet_spawn
+from werkzeug.exceptions import HTTPException
+
+import app
+from database import ASYNC_ENVIRON_KEY
+from models import db
+
+
+ASYNC_ENDPOINTS = {
+    'venues.venues', 'venues.search_venues', 'venues.show_venue', 'venues.venue_calendar',
+    'artists.artists', 'artists.search_artists', 'artists.show_artist', 'artists.artist_calendar',
+    'shows.shows',
+    'api.venues', 'api.search_venues', 'api.venue', 'api.artists', 'api.search_artists', 'api.artist',
+    'api.shows', 'api.show',
+    'healthz',
+}
+
+
+def wsgi_environ(scope, body):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    host, port = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'], environ['SERVER_PORT'] = host, str(port)
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name in ('content-type', 'content-length'):
+            key = name.upper().replace('-', '_')
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+class AsyncReads:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope {scope['type']}")
+
+        environ = wsgi_environ(scope, await read_body(receive))
+        if self.endpoint(environ) in ASYNC_ENDPOINTS:
+            environ[ASYNC_ENVIRON_KEY] = True
+            status, headers, body = await greenlet_spawn(self.respond, environ)
+            await send_start(send, status, headers)
+            await send({'type': 'http.response.body', 'body': body})
+        else:
+            await self.respond_in_thread(environ, send)
+
+    def endpoint(self, environ):
+        try:
+            rule, _ = self.app.url_map.bind_to_environ(environ).match(return_rule=True)
+        except HTTPException:
+            return None
+        return rule.endpoint
+
+    def start(self, environ):
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [int(status.split(' ', 1)[0]), headers]
+
+        result = self.app(environ, start_response)
+        return response[0], response[1], result
+
+    def respond(self, environ):
+        status, headers, result = self.start(environ)
+        try:
+            return status, headers, b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    async def respond_in_thread(self, environ, send):
+        # every step runs in the same copied context, so a streamed body
+        # keeps the request context its first step pushed
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        status, headers, result = await loop.run_in_executor(None, context.run, self.start, environ)
+        await send_start(send, status, headers)
+        chunks = iter(result)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, context.run, next, chunks, None)
+                if chunk is None:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(None, context.run, result.close)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await greenlet_spawn(self.dispose)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def dispose(self):
+        with self.app.app_context():
+            db.engines['async'].dispose()
+
+
+async def send_start(send, status, headers):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    })
+
+
+def create_app():
+    return AsyncReads(app.create_app(ASYNC_READS=True))
@@ -0,0 +1,99 @@
+#----------------------------------------------------------------------------#
+# Query plans for the indexed lookups, with and without their indexes.
+#
+#   $ python bench_indexes.py
+#
+# On Postgres every index is dropped inside a transaction that is rolled
+# back, so the database is left untouched, and both plans and timings are
+# printed. Other databases can't be trusted to roll DDL back, so only the
+# current plan is shown. Seed a realistic amount of data first: on small
+# tables the planner picks a sequential scan with or without an index.
+#----------------------------------------------------------------------------#
+
+import time
+from datetime import datetime
+
+from app import create_app
+from models import db
+
+
+LOOKUPS = [
+    ('ix_shows_venue_id_start_time', 'upcoming shows at a venue',
+     'SELECT * FROM shows WHERE venue_id = :venue_id AND start_time > :now'),
+    ('ix_shows_artist_id_start_time', 'past shows of an artist',
+     'SELECT * FROM shows WHERE artist_id = :artist_id AND start_time <= :now'),
+    ('ix_shows_start_time_id', 'a /shows page',
+     'SELECT * FROM shows WHERE (start_time, id) > (:now, 0) ORDER BY start_time, id LIMIT 50'),
+    ('ix_venue_state_city', 'a /venues page',
+     'SELECT * FROM "Venue" WHERE (coalesce(state, \'\'), coalesce(city, \'\'), id) > (:state, :city, 0) '
+     'ORDER BY coalesce(state, \'\'), coalesce(city, \'\'), id LIMIT 50'),
+    ('ix_venue_lower_name', 'Venue.exists',
+     'SELECT count(*) FROM "Venue" WHERE lower(name) = lower(:venue_name)'),
+    ('ix_artist_lower_name', 'Artist.exists',
+     'SELECT count(*) FROM "Artist" WHERE lower(name) = lower(:artist_name)'),
+    ('ix_venue_lower_city', 'venues in a city, any case',
+     'SELECT id FROM "Venue" WHERE lower(city) = lower(:city)'),
+    ('ix_venue_genre_venue_id_genre_id', 'genres of a venue',
+     'SELECT genre_id FROM venue_genre WHERE venue_id = :venue_id'),
+    ('ix_artist_genre_artist_id_genre_id', 'genres of an artist',
+     'SELECT genre_id FROM artist_genre WHERE artist_id = :artist_id'),
+]
+
+REPEAT = 20
+
+
+def sample_params(connection):
+    venue = connection.execute(db.text('SELECT id, name, state, city FROM "Venue" LIMIT 1')).first()
+    artist = connection.execute(db.text('SELECT id, name FROM "Artist" LIMIT 1')).first()
+    return {
+        'now': datetime.now(),
+        'venue_id': venue.id if venue else 0,
+        'venue_name': venue.name if venue else '',
+        'state': venue.state if venue else '',
+        'city': venue.city if venue else '',
+        'artist_id': artist.id if artist else 0,
+        'artist_name': artist.name if artist else '',
+    }
+
+
+def plan(connection, sql, params):
+    if connection.dialect.name == 'postgresql':
+        prefix = 'EXPLAIN '
+    else:
+        prefix = 'EXPLAIN QUERY PLAN '
+    rows = connection.execute(db.text(prefix + sql), params).fetchall()
+    return '\n'.join(f'    {row[-1]}' for row in rows)
+
+
+def timing(connection, sql, params):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        connection.execute(db.text(sql), params).fetchall()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def report(connection, label, sql, params):
+    print(f'  {label}: {timing(connection, sql, params):.3f} ms/query')
+    print(plan(connection, sql, params))
+
+
+def main():
+    with create_app().app_context():
+        with db.engine.connect() as connection:
+            params = sample_params(connection)
+            postgres = connection.dialect.name == 'postgresql'
+            for index, description, sql in LOOKUPS:
+                print(f'{description} ({index})')
+                report(connection, 'with index', sql, params)
+                if postgres:
+                    transaction = connection.begin_nested() if connection.in_transaction() else connection.begin()
+                    try:
+                        connection.execute(db.text(f'DROP INDEX "{index}"'))
+                        report(connection, 'without index', sql, params)
+                    finally:
+                        transaction.rollback()
+                print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#----------------------------------------------------------------------------#
+# Worker startup profile.
+#
+#   $ python bench_startup.py                  # boot time, RSS, costliest imports
+#   $ python bench_startup.py --runs 10 --top 30
+#
+# Boots the app the way a WSGI worker does (import app, create_app()) in a
+# fresh interpreter started with -X importtime, and reports the boot time,
+# the peak RSS and the packages whose modules took the longest to import.
+# Boot time and RSS are the medians of --runs interpreters.
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BOOT = '''
+import json, resource, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print(json.dumps({
+    'boot': time.perf_counter() - start,
+    'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def boot():
+    # a new interpreter each time, so nothing is imported already
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', BOOT], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+
+def import_costs(importtime):
+    """Milliseconds spent importing each top-level package, from -X importtime output."""
+    # "import time: self [us] | cumulative | imported package"; summing the
+    # self times counts every module once, whoever imported it
+    costs = {}
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        costs[package] = costs.get(package, 0) + int(own) / 1000
+    return costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile how long a worker takes to build the app.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='packages to list')
+    args = parser.parse_args()
+
+    runs = [boot() for _ in range(args.runs)]
+    stats = [stats for stats, _ in runs]
+    costs = import_costs(runs[-1][1])
+
+    print(f"boot        {statistics.median(run['boot'] for run in stats) * 1000:8.1f} ms")
+    # ru_maxrss is in kilobytes on Linux
+    print(f"peak RSS    {statistics.median(run['rss'] for run in stats) / 1024:8.1f} MB")
+    print(f"modules     {stats[-1]['modules']:8}")
+    print(f"imports     {sum(costs.values()):8.1f} ms")
+    print(f"\n{'package':30} {'import ms':>10}")
+    for package in sorted(costs, key=costs.get, reverse=True)[:args.top]:
+        print(f'{package:30} {costs[package]:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
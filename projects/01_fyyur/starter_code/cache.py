@@ -0,0 +1,154 @@
+#----------------------------------------------------------------------------#
+# Response cache.
+#
+# Rendered pages are cached under their path and query string plus the
+# generation of every tag they depend on ('venues', 'venue:3', ...).
+# Evicting a tag bumps its generation, so every page built from it misses
+# from then on and its stale entries age out of the backend.
+#
+# A view can also key its pages on a version of their data (see
+# ResponseCache.version), which helpers.conditional does with the ETag.
+#
+# CACHE_BACKEND selects an in-process LRU ('memory') or a Redis-compatible
+# server ('redis', at CACHE_REDIS_URL), or turns caching off (None). The
+# memory backend is only correct with a single worker: evictions reach the
+# process that made them and no other, so a write in another worker or a
+# `flask` command (imports, rebuild-show-counters) leaves the pages of the
+# others stale for up to CACHE_TTL. Run several workers against redis.
+#----------------------------------------------------------------------------#
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import Response, g, request, session
+
+
+class MemoryBackend:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def generation(self, tag):
+        return self.generations.get(tag, 0)
+
+    def incr(self, tag):
+        with self.lock:
+            self.generations[tag] = self.generations.get(tag, 0) + 1
+
+
+class RedisBackend:
+    def __init__(self, url):
+        # optional dependency, only needed when CACHE_BACKEND = 'redis'
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def generation(self, tag):
+        return int(self.client.get(f'gen:{tag}') or 0)
+
+    def incr(self, tag):
+        self.client.incr(f'gen:{tag}')
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        backend = app.config['CACHE_BACKEND']
+        if backend == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif backend == 'memory':
+            self.backend = MemoryBackend(app.config['CACHE_MAX_ENTRIES'])
+        else:
+            self.backend = None
+
+    def key(self, tags):
+        generations = ':'.join(f'{tag}={self.backend.generation(tag)}' for tag in tags)
+        return f"page:{request.full_path}:{generations}:{g.get('cache_version', '')}"
+
+    def cached(self, *tags):
+        """Cache a GET view's 200 responses, tagged with tags formatted with the view's arguments."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                # pages carrying a flashed message are one-offs
+                if self.backend is None or '_flashes' in session:
+                    return view(**kwargs)
+
+                key = self.key([tag.format(**kwargs) for tag in tags])
+                hit = self.backend.get(key)
+                if hit is not None:
+                    body, mimetype = hit
+                    response = Response(body, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = self.app.make_response(view(**kwargs))
+                if response.status_code == 200:
+                    self.backend.set(key, (response.get_data(), response.mimetype), self.ttl())
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def version(self, version):
+        """Key the page being rendered on version too, e.g. its ETag.
+
+        A tag is only evicted by writes that reach this process's backend;
+        a page keyed on the version of the rows it shows misses as soon as
+        they change, whoever changed them.
+        """
+        g.cache_version = version
+
+    def expire_at(self, moment):
+        """Cap the lifetime of the page being rendered, e.g. at the next show's start."""
+        if moment is not None:
+            g.cache_expires_at = min(moment, g.get('cache_expires_at', moment))
+
+    def ttl(self):
+        ttl = self.app.config['CACHE_TTL']
+        expires_at = g.pop('cache_expires_at', None)
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.now()).total_seconds())
+        return max(1, ttl)
+
+    def evict(self, *tags):
+        if self.backend is None:
+            return
+        for tag in set(tags):
+            self.backend.incr(tag)
@@ -0,0 +1,75 @@
+#----------------------------------------------------------------------------#
+# Calendar feeds of a venue's or an artist's shows.
+#
+# A feed holds the shows from CALENDAR_PAST_DAYS ago onwards, read with one
+# range scan of the venue/artist start_time index. Times are written as
+# floating local times, the way they are stored.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from models import Show, Venue
+
+
+def feed_shows(past_days, **filters):
+    criteria = Show.window(start=datetime.now() - timedelta(days=past_days), **filters)
+    query = Show.details_query().add_columns(Venue.address, Venue.city, Venue.state)
+    return query.filter(*criteria).order_by(Show.start_time, Show.id).all()
+
+
+def escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def fold(line):
+    # content lines are folded at 75 octets, continuation lines start with a space
+    encoded = line.encode('utf-8')
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # never split a multi-byte character
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+
+def ical(name, shows, host):
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Fyyur//Shows//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{escape(name)}',
+    ]
+    for show in shows:
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:show-{show.id}@{host}',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{show.start_time.strftime("%Y%m%dT%H%M%S")}',
+            f'SUMMARY:{escape(f"{show.artist_name} at {show.venue_name}")}',
+            f'LOCATION:{escape(", ".join(part for part in (show.address, show.city, show.state) if part))}',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(fold(line) for line in lines) + '\r\n'
+
+
+def events(shows):
+    return [
+        {
+            'id': show.id,
+            'title': f'{show.artist_name} at {show.venue_name}',
+            'start': show.start_time.isoformat(),
+            'venue_id': show.venue_id,
+            'venue_name': show.venue_name,
+            'artist_id': show.artist_id,
+            'artist_name': show.artist_name,
+            'location': ', '.join(part for part in (show.address, show.city, show.state) if part),
+        }
+        for show in shows
+    ]
@@ -0,0 +1,88 @@
+#----------------------------------------------------------------------------#
+# `flask` commands, registered on the app by create_app().
+#----------------------------------------------------------------------------#
+
+import json
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from exporter import EXPORTS, MIMETYPES, export_chunks
+from helpers import run_import
+from jobs import jobs
+from models import rebuild_all_show_counters
+
+
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@with_appcontext
+def import_data_command(kind, path, format):
+  """Import venues, artists or shows from a CSV or NDJSON file."""
+  from importer import detect_format
+
+  with open(path, encoding='utf-8-sig', newline='') as stream:
+    report = run_import(kind, stream, detect_format(path, format))
+  for error in report['errors']:
+    click.echo(f"line {error['line']}: {json.dumps(error['errors'])}", err=True)
+  click.echo(f"{report['inserted']} {kind} imported, {report['failed']} rows rejected")
+
+@click.command('export-data')
+@click.argument('kind', type=click.Choice(list(EXPORTS)))
+@click.argument('output', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--format', type=click.Choice(list(MIMETYPES)), default='csv')
+@with_appcontext
+def export_data_command(kind, output, format):
+  """Stream venues, artists, shows or genre associations to a file (default stdout)."""
+  for chunk in export_chunks(kind, format, current_app.config['EXPORT_BATCH_SIZE']):
+    output.write(chunk)
+
+@click.command('jobs-status')
+@with_appcontext
+def jobs_status_command():
+  """Show how many background jobs are queued and how many have failed for good."""
+  click.echo(f'{jobs.depth()} jobs queued, {jobs.dead_count()} dead')
+
+@click.command('jobs-retry')
+@with_appcontext
+def jobs_retry_command():
+  """Put every dead job back on the queue."""
+  click.echo(f'{jobs.retry_dead()} dead jobs queued again')
+
+@click.command('compile-templates')
+@with_appcontext
+def compile_templates_command():
+  """Compile every template into TEMPLATE_CACHE_DIR, e.g. as a deploy step."""
+  from app import warm_templates
+
+  names = warm_templates(current_app)
+  click.echo(f"{len(names)} templates compiled into {current_app.config['TEMPLATE_CACHE_DIR']}")
+
+@click.command('rebuild-show-counters')
+@with_appcontext
+def rebuild_show_counters_command():
+  """Recount every venue's and artist's upcoming/past shows from the shows table.
+
+  The job workers already do this hourly (JOB_SCHEDULE), so shows that
+  have started move from the upcoming to the past counters; run it by
+  hand after changing shows behind the app's back. The pages showing the
+  rebuilt counters are evicted; with the memory cache backend that only
+  reaches this process, so the servers' copies expire after CACHE_TTL.
+  """
+  venue_ids, artist_ids = rebuild_all_show_counters()
+  click.echo(f'{len(venue_ids) + len(artist_ids)} venue/artist counters were out of date and have been rebuilt')
+
+COMMANDS = (
+  import_data_command,
+  export_data_command,
+  jobs_status_command,
+  jobs_retry_command,
+  compile_templates_command,
+  rebuild_show_counters_command,
+)
+
+def register_commands(app):
+  for command in COMMANDS:
+    app.cli.add_command(command)
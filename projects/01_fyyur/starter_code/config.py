@@ -3,11 +3,113 @@ SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+
+def env(name, default, cast=str):
+    value = os.environ.get(name)
+    return default if value is None else cast(value)
+
+
+def flag(value):
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+# Settings profile: development, production or test (FYYUR_ENV). Each
+# setting below can still be overridden by its own environment variable.
+PROFILE = env('FYYUR_ENV', 'development')
+PROFILES = {
+    'development': {'DEBUG': True, 'DB_POOL_SIZE': 5, 'DB_MAX_OVERFLOW': 5, 'DB_POOL_TIMEOUT': 10,
+                    'DB_STATEMENT_TIMEOUT': 0},
+    'production': {'DEBUG': False, 'DB_POOL_SIZE': 10, 'DB_MAX_OVERFLOW': 20, 'DB_POOL_TIMEOUT': 5,
+                   'DB_STATEMENT_TIMEOUT': 15},
+    'test': {'DEBUG': False, 'DB_POOL_SIZE': 2, 'DB_MAX_OVERFLOW': 0, 'DB_POOL_TIMEOUT': 5,
+             'DB_STATEMENT_TIMEOUT': 5},
+}
+defaults = PROFILES[PROFILE]
+
 # Enable debug mode.
-DEBUG = True
+DEBUG = env('FLASK_DEBUG', defaults['DEBUG'], flag)
 
 # Connect to the database
+SQLALCHEMY_DATABASE_URI = env('DATABASE_URL', 'postgresql://postgres@localhost:5433/fyyur_db')
+# Optional read replica: GET requests read from it, writes go to the primary
+DATABASE_REPLICA_URL = env('DATABASE_REPLICA_URL', None)
+
+# Async serving (asgi.py sets ASYNC_READS): the read pages are served on an
+# event loop through an async driver. The URL defaults to the replica's, or
+# else the primary's, with asyncpg or aiosqlite as the driver.
+ASYNC_READS = False
+DATABASE_ASYNC_URL = env('DATABASE_ASYNC_URL', None)
+
+# Connection pool of each engine (see database.py). Pre-ping and recycle
+# replace connections that died with a database restart or idle timeout;
+# the statement timeout (seconds, 0 = none) applies to Postgres only.
+DB_POOL_SIZE = env('DB_POOL_SIZE', defaults['DB_POOL_SIZE'], int)
+DB_MAX_OVERFLOW = env('DB_MAX_OVERFLOW', defaults['DB_MAX_OVERFLOW'], int)
+DB_POOL_TIMEOUT = env('DB_POOL_TIMEOUT', defaults['DB_POOL_TIMEOUT'], float)
+DB_POOL_RECYCLE = env('DB_POOL_RECYCLE', 1800, int)
+DB_POOL_PRE_PING = env('DB_POOL_PRE_PING', True, flag)
+DB_STATEMENT_TIMEOUT = env('DB_STATEMENT_TIMEOUT', defaults['DB_STATEMENT_TIMEOUT'], float)
+
+# Venue and artist pages load the entity and its shows at the same time,
+# on a pool of this many threads per process (0 loads them one after the
+# other), and answer 503 when the loads take longer than DETAIL_TIMEOUT
+DETAIL_LOAD_WORKERS = env('DETAIL_LOAD_WORKERS', 8, int)
+DETAIL_TIMEOUT = env('DETAIL_TIMEOUT', 5, float)
+
+# Listing pages (/venues, /artists, /shows) are keyset paginated
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Maximum number of venue/artist search results
+SEARCH_LIMIT = 50
+# Seconds before the in-process name index (SQLite only, see search.py) is
+# rebuilt to pick up names written by other processes
+NAME_INDEX_TTL = 60
+
+# In debug and test runs, flag a request that repeats the same statement
+# more than this many times (see query_detector.py)
+N_PLUS_ONE_THRESHOLD = 5
+
+# Response cache for the listing and detail pages (see cache.py).
+# 'memory' is per process and only correct with a single worker: use
+# 'redis' when running several workers (gunicorn.conf.py warns), or None
+# to serve every page uncached.
+CACHE_BACKEND = 'memory'
+CACHE_REDIS_URL = 'redis://localhost:6379/0'
+CACHE_TTL = 300
+CACHE_MAX_ENTRIES = 1024
+
+# Seconds before the genre id/name maps are reloaded to pick up genres
+# added by other processes
+GENRE_CACHE_TTL = 600
+
+# Bulk import (see importer.py): rows per INSERT/commit, and how many
+# rejected rows are listed in the report
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+
+# Rows fetched per round trip by the streaming export (see exporter.py)
+EXPORT_BATCH_SIZE = 1000
+
+# How far back venue and artist calendar feeds go
+CALENDAR_PAST_DAYS = 30
+
+# Background jobs (see jobs.py): the local queue file, worker threads per
+# process (0 runs jobs inline), and retries before a job is dead-lettered
+JOB_QUEUE_PATH = os.path.join(basedir, 'jobs.sqlite3')
+JOB_WORKERS = 2
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 2
+JOB_TIMEOUT = 300
+# Tasks run every so many seconds by the workers. Shows that have started
+# move from the upcoming to the past counters once an hour.
+JOB_SCHEDULE = {'rebuild_all_show_counters': 3600}
 
+# Webhooks notified of new venues, artists and shows
+NOTIFY_WEBHOOKS = [url for url in os.environ.get('NOTIFY_WEBHOOKS', '').split(',') if url]
+NOTIFY_TIMEOUT = 5
 
-# TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI ='postgres://postgres@localhost:5433/fyyur_db'
+# Compiled templates are cached on disk here, and compiled at startup
+# when TEMPLATE_WARMUP is on
+TEMPLATE_CACHE_DIR = env('TEMPLATE_CACHE_DIR', os.path.join(basedir, '.template_cache'))
+TEMPLATE_WARMUP = env('TEMPLATE_WARMUP', True, flag)
@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------#
+# pytest fixtures.
+#
+#   $ python -m pytest
+#
+# Each test gets an app on a fresh in-memory SQLite database, in testing
+# mode (so the N+1 detector raises, see query_detector.py), with jobs run
+# inline and the response cache off, so every request hits the database.
+# A test module can change any of these by redefining the settings fixture.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from models import Artist, ArtistGenre, Genre, Show, Venue, VenueGenre, db, genre_lookup, name_indexes
+
+
+@pytest.fixture
+def settings():
+    """Config overrides for the app; a test module redefines this fixture to change them."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, settings):
+    app = create_app(**dict({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'JOB_QUEUE_PATH': str(tmp_path / 'jobs.sqlite3'),
+        'JOB_WORKERS': 0,
+        'CACHE_BACKEND': None,
+        'TEMPLATE_WARMUP': False,
+    }, **settings))
+    # both are process-wide and would still hold the previous test's rows
+    genre_lookup.invalidate()
+    name_indexes.clear()
+    # only the primary's tables: tests/test_asgi.py adds an 'async' bind
+    # to the shared db, which the other apps don't configure
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_rows(app):
+    """Seeds two genres and one venue and artist; add_rows(n) adds n more of each."""
+    def add_rows(count):
+        # venues and artists tagged with every genre, and shows between
+        # them and venue 1 / artist 1, past and upcoming
+        with app.app_context():
+            now = datetime.now()
+            first = Venue.query.count() + 1
+            venues = [Venue(name=f'Venue {n}', city='San Francisco', state='CA') for n in range(first, first + count)]
+            artists = [Artist(name=f'Artist {n}', city='Austin', state='TX') for n in range(first, first + count)]
+            db.session.add_all(venues + artists)
+            db.session.flush()
+
+            genre_ids = [id for (id,) in db.session.query(Genre.id)]
+            VenueGenre.sync({venue.id: genre_ids for venue in venues})
+            ArtistGenre.sync({artist.id: genre_ids for artist in artists})
+            for venue, artist in zip(venues, artists):
+                for days in (-10, 10):
+                    db.session.add(Show(venue_id=venue.id, artist_id=1, start_time=now + timedelta(days=days)))
+                    db.session.add(Show(venue_id=1, artist_id=artist.id, start_time=now + timedelta(days=days)))
+            db.session.commit()
+
+    with app.app_context():
+        db.session.add_all([Genre(name='Jazz'), Genre(name='Folk')])
+        db.session.commit()
+    add_rows(1)
+    return add_rows
@@ -0,0 +1,283 @@
+#----------------------------------------------------------------------------#
+# Engine pools and read-replica routing.
+#
+# configure_database() turns the DB_* settings of config.py into engine
+# options for the primary and, when DATABASE_REPLICA_URL is set, for a
+# 'replica' bind. RoutingSession sends the reads of GET/HEAD requests to
+# the replica; writes, flushes and everything outside a request use the
+# primary. pool_stats records how long checkouts wait for a connection,
+# exported on /metrics with each pool's saturation.
+#
+# With ASYNC_READS (asgi.py) an 'async' bind is added as well, on an async
+# driver; requests the ASGI app serves on its event loop use only it.
+#
+# load_concurrently() runs the independent loads of one page at the same
+# time, each on its own pooled connection, within DETAIL_TIMEOUT.
+#----------------------------------------------------------------------------#
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import copy_current_request_context, current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.util import await_only, greenlet_spawn
+
+from instrumentation import Histogram, SECONDS_BUCKETS
+from query_detector import merge_fingerprints
+
+
+READ_METHODS = ('GET', 'HEAD')
+
+# the async driver that replaces each backend's default one
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+# set in the WSGI environ of the requests served on the event loop
+ASYNC_ENVIRON_KEY = 'fyyur.async'
+
+
+class PoolStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waits = {}
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.waits.get(name)
+            if histogram is None:
+                histogram = self.waits[name] = Histogram(SECONDS_BUCKETS)
+            histogram.observe(seconds)
+
+    def lines(self, engines, capacity):
+        yield '# TYPE fyyur_db_pool_wait_seconds histogram'
+        with self.lock:
+            for name in sorted(self.waits):
+                yield from self.waits[name].lines('fyyur_db_pool_wait_seconds', name, label='pool')
+        yield '# TYPE fyyur_db_pool_checked_out gauge'
+        checked_out = {name: engine.pool.checkedout() for name, engine in engines.items()
+                       if isinstance(engine.pool, QueuePool)}
+        for name, count in sorted(checked_out.items()):
+            yield f'fyyur_db_pool_checked_out{{pool="{name}"}} {count}'
+        yield '# TYPE fyyur_db_pool_saturation gauge'
+        for name, count in sorted(checked_out.items()):
+            yield f'fyyur_db_pool_saturation{{pool="{name}"}} {count / capacity:.3f}'
+
+
+pool_stats = PoolStats()
+
+
+class TimedPool:
+    # records how long each checkout waited; the pool's logging_name
+    # ('primary', 'replica' or 'async') survives pool recreation
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.observe(self.logging_name, time.perf_counter() - start)
+
+
+class TimedQueuePool(TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def database_url(url):
+    # postgres:// is the scheme Heroku-style DATABASE_URLs use, but not one
+    # SQLAlchemy accepts
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def async_database_url(url):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver for {backend} databases')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}').render_as_string(hide_password=False)
+
+
+def engine_options(url, config, name):
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == 'sqlite':
+        # SQLite engines use single-connection pools that take no sizing
+        return options
+    is_async = url.get_dialect().is_async
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_logging_name=name,
+        pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT'],
+        pool_recycle=config['DB_POOL_RECYCLE'],
+    )
+    if backend == 'postgresql' and config['DB_STATEMENT_TIMEOUT']:
+        timeout_ms = int(config['DB_STATEMENT_TIMEOUT'] * 1000)
+        if is_async:
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(timeout_ms)}}
+        else:
+            options['connect_args'] = {'options': f'-c statement_timeout={timeout_ms}'}
+    return options
+
+
+def configure_database(app):
+    """Set the engine options and replica bind; call before db.init_app(app)."""
+    config = app.config
+    url = config['SQLALCHEMY_DATABASE_URI'] = database_url(config['SQLALCHEMY_DATABASE_URI'])
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url, config, 'primary')
+    replica_url = database_url(config['DATABASE_REPLICA_URL'])
+    if replica_url:
+        config.setdefault('SQLALCHEMY_BINDS', {})['replica'] = dict(
+            engine_options(replica_url, config, 'replica'), url=replica_url
+        )
+    if config['ASYNC_READS']:
+        # the async reads go to the replica when there is one
+        async_url = database_url(config['DATABASE_ASYNC_URL']) or async_database_url(replica_url or url)
+        config.setdefault('SQLALCHEMY_BINDS', {})['async'] = dict(
+            engine_options(async_url, config, 'async'), url=async_url
+        )
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and serves_async():
+            return self._db.engines['async']
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and reads_from_replica():
+            replica = self._db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def reads_from_replica():
+    return has_request_context() and request.method in READ_METHODS
+
+
+def serves_async():
+    return has_request_context() and request.environ.get(ASYNC_ENVIRON_KEY, False)
+
+
+def select_one(engine):
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+
+
+def ping(engine):
+    """Check that engine can reach its database; raises SQLAlchemyError when it can't."""
+    if serves_async() and not engine.dialect.is_async:
+        # a sync driver would block the event loop, and every request on it,
+        # for as long as the database takes to answer
+        await_only(asyncio.to_thread(select_one, engine))
+    else:
+        select_one(engine)
+
+
+#  Concurrent loads
+#  ----------------------------------------------------------------
+
+class LoadTimeout(Exception):
+    pass
+
+
+executor = None
+executor_pid = None
+
+
+def thread_pool(workers):
+    # created lazily, so a forked worker process gets its own threads
+    global executor, executor_pid
+    if executor is None or executor_pid != os.getpid():
+        executor = ThreadPoolExecutor(workers, thread_name_prefix='load')
+        executor_pid = os.getpid()
+    return executor
+
+
+def branch(load):
+    # the load runs in a copy of the request context and so in an app
+    # context of its own: its own session, its own connection. Its
+    # statements are counted and fingerprinted apart and added to the
+    # request's afterwards.
+    counted = 'request_stats' in g
+    fingerprinted = 'query_fingerprints' in g
+
+    @copy_current_request_context
+    def run():
+        if counted:
+            g.request_stats = {'queries': 0, 'db': 0.0, 'render': 0.0}
+        if fingerprinted:
+            g.query_fingerprints = {}
+        return load(), g.get('request_stats'), g.get('query_fingerprints')
+    return run
+
+
+async def gather(runs, timeout):
+    # a greenlet starts in the context of the request it was spawned from;
+    # an empty one makes the copied request context push its own app context
+    greenlets = (greenlet_spawn(contextvars.Context().run, run) for run in runs)
+    return await asyncio.wait_for(asyncio.gather(*greenlets), timeout)
+
+
+def load_concurrently(*loads):
+    """Call the loads at the same time, each on its own connection; returns their results in order.
+
+    Requests served on the event loop (asgi.py) run them as greenlets,
+    the others in a pool of DETAIL_LOAD_WORKERS threads. Raises LoadTimeout
+    when they don't all finish within DETAIL_TIMEOUT seconds. Outside a
+    request, with DETAIL_LOAD_WORKERS = 0 or with unflushed changes in the
+    session, they run one after another.
+    """
+    from models import db
+
+    workers = current_app.config['DETAIL_LOAD_WORKERS']
+    timeout = current_app.config['DETAIL_TIMEOUT']
+    session = db.session()
+    if len(loads) < 2 or not workers or not has_request_context() or session.new or session.dirty or session.deleted:
+        return [load() for load in loads]
+
+    # give the request's connection back first: a request holding one while
+    # its loads wait for theirs could starve the pool under load. Nothing is
+    # pending, so the commit only ends the transaction; the objects the view
+    # loaded stay attached and unexpired.
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
+    runs = [branch(load) for load in loads]
+    if serves_async():
+        try:
+            results = await_only(gather(runs, timeout))
+        except asyncio.TimeoutError:
+            raise LoadTimeout(f'Page loads took longer than {timeout}s') from None
+    else:
+        futures = [thread_pool(workers).submit(run) for run in runs]
+        done, pending = wait(futures, timeout)
+        if pending:
+            for future in pending:
+                future.cancel()
+            raise LoadTimeout(f'Page loads took longer than {timeout}s')
+        results = [future.result() for future in futures]
+
+    stats = g.get('request_stats')
+    fingerprints = g.get('query_fingerprints')
+    for _, loaded_stats, loaded_fingerprints in results:
+        if stats is not None and loaded_stats is not None:
+            stats['queries'] += loaded_stats['queries']
+            stats['db'] += loaded_stats['db']
+        if fingerprints is not None and loaded_fingerprints is not None:
+            merge_fingerprints(fingerprints, loaded_fingerprints)
+    return [result for result, _, _ in results]
@@ -0,0 +1,87 @@
+#----------------------------------------------------------------------------#
+# Streaming export of venues, artists, shows and genre associations.
+#
+# Rows are read through a server-side cursor (yield_per implies
+# stream_results) EXPORT_BATCH_SIZE at a time and serialized chunk by
+# chunk, so memory stays flat however large the table is. Columns carry
+# the field names importer.py reads; genres are exported on their own as
+# venue_genres/artist_genres.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from models import Artist, ArtistGenre, Genre, Show, Venue, VenueGenre, db
+
+
+def entity_columns(model):
+    # internal bookkeeping columns are not part of the catalog
+    return [
+        column for column in model.__table__.columns
+        if column.name not in ('upcoming_shows_count', 'past_shows_count', 'version', 'updated_at')
+    ]
+
+
+def genre_query(association, key):
+    return (
+        db.select(key, Genre.name.label('genre'))
+        .join(Genre, Genre.id == association.genre_id)
+        .order_by(key, Genre.name)
+    )
+
+
+EXPORTS = {
+    'venues': lambda: db.select(*entity_columns(Venue)).order_by(Venue.id),
+    'artists': lambda: db.select(*entity_columns(Artist)).order_by(Artist.id),
+    'shows': lambda: db.select(Show.id, Show.venue_id, Show.artist_id, Show.start_time).order_by(Show.id),
+    'venue_genres': lambda: genre_query(VenueGenre, VenueGenre.venue_id),
+    'artist_genres': lambda: genre_query(ArtistGenre, ArtistGenre.artist_id),
+}
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class InvalidExport(ValueError):
+    pass
+
+
+def check(kind, format):
+    if kind not in EXPORTS:
+        raise InvalidExport(f'Unknown kind {kind!r}, expected one of {", ".join(EXPORTS)}')
+    if format not in MIMETYPES:
+        raise InvalidExport(f'Unknown format {format!r}, expected one of {", ".join(MIMETYPES)}')
+
+
+def json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def export_chunks(kind, format, batch_size=1000):
+    """Yield the export of kind as text, one chunk per batch_size rows."""
+    check(kind, format)
+    result = db.session.execute(EXPORTS[kind]().execution_options(yield_per=batch_size))
+    columns = list(result.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == 'csv':
+        writer.writerow(columns)
+
+    for rows in result.partitions():
+        if format == 'csv':
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(columns, row)), default=json_value))
+                buffer.write('\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if format == 'csv' and buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,18 @@
+#----------------------------------------------------------------------------#
+# Extensions shared by the blueprints.
+#
+# Created unbound so the blueprints can decorate their views with them at
+# import time; create_app() in app.py binds them to the app.
+#----------------------------------------------------------------------------#
+
+from flask_moment import Moment
+
+from cache import ResponseCache
+from instrumentation import Instrumentation
+from query_detector import QueryDetector
+
+
+moment = Moment()
+instrumentation = Instrumentation()
+query_detector = QueryDetector()
+response_cache = ResponseCache()
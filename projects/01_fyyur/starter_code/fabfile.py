@@ -13,6 +13,13 @@ def test():
         abort("Aborted at user request.")
 
 
+def bench():
+    result = local("python bench_routes.py", capture=True)
+    print(result)
+    if result.failed and not confirm("Benchmark regressed. Continue?"):
+        abort("Aborted at user request.")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -0,0 +1,37 @@
+#----------------------------------------------------------------------------#
+# Gunicorn settings for the pre-fork mode, see prefork.py.
+#
+#   $ gunicorn 'app:create_app()'
+#   $ python prefork.py $(cat gunicorn.pid)     # shared vs private memory
+#
+# gunicorn reads this file from the working directory by default.
+#----------------------------------------------------------------------------#
+
+import os
+
+import prefork
+
+
+bind = os.environ.get('BIND', '0.0.0.0:' + os.environ.get('PORT', '5000'))
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+pidfile = 'gunicorn.pid'
+
+# build the app once in the master, the workers inherit it
+preload_app = True
+
+
+def when_ready(server):
+    app = server.app.wsgi()
+    if server.cfg.workers > 1 and app.config['CACHE_BACKEND'] == 'memory':
+        # each worker would evict only its own copies of a changed page
+        server.log.warning("CACHE_BACKEND = 'memory' with %d workers serves stale pages "
+                           "for up to CACHE_TTL after writes; use 'redis'", server.cfg.workers)
+    prefork.preload(app)
+
+
+def pre_fork(server, worker):
+    prefork.before_fork()
+
+
+def post_fork(server, worker):
+    prefork.after_fork(server.app.wsgi())
@@ -0,0 +1,110 @@
+#----------------------------------------------------------------------------#
+# Helpers shared by the page blueprints.
+#
+# Also registers the background job tasks a write submits after its commit,
+# so every process that creates the app can run them.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import json
+import urllib.request
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, current_app, jsonify, request, url_for
+
+from extensions import response_cache
+from jobs import jobs
+from models import Show
+
+
+def page_args():
+  cursor = request.args.get('cursor')
+  limit = request.args.get('limit', current_app.config['PAGE_SIZE'], type=int)
+  return cursor, max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+
+def next_page_url(next_cursor, limit):
+  if next_cursor is None:
+    return None
+  # keep the page's filters
+  return url_for(request.endpoint, **dict(request.args, cursor=next_cursor, limit=limit))
+
+def expire_at_next_show(details):
+  # the cached page goes stale when its first upcoming show becomes a past one
+  if details['upcoming_shows']:
+    response_cache.expire_at(datetime.strptime(details['upcoming_shows'][0]['start_time'], "%m/%d/%Y, %H:%M"))
+
+def conditional(load_validators):
+  # answer If-None-Match / If-Modified-Since from the page's row versions,
+  # before the page is loaded or rendered
+  def decorator(view):
+    @wraps(view)
+    def wrapper(**kwargs):
+      validators = load_validators(**kwargs)
+      if validators is None:
+        return view(**kwargs)
+
+      validators, last_modified = validators
+      etag = hashlib.sha1(repr(validators).encode()).hexdigest()
+      last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+      if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+      else:
+        not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+
+      # a cached body is only served under the ETag it was rendered with
+      response_cache.version(etag)
+      response = Response(status=304) if not_modified else current_app.make_response(view(**kwargs))
+      response.set_etag(etag)
+      response.last_modified = last_modified
+      return response
+    return wrapper
+  return decorator
+
+def calendar_response(name, format, **filters):
+  from calendars import events, feed_shows, ical
+
+  shows = feed_shows(current_app.config['CALENDAR_PAST_DAYS'], **filters)
+  if format == 'json':
+    return jsonify({'name': name, 'events': events(shows)})
+  return Response(ical(name, shows, request.host), mimetype='text/calendar')
+
+# follow-up work of a write, run as background jobs after the commit; the
+# evictions are local tasks, so they reach this process's memory cache
+
+@jobs.task(local=True)
+def evict_pages(*tags):
+  response_cache.evict(*tags)
+
+@jobs.task(local=True)
+def evict_venue_pages(venue_id):
+  response_cache.evict('venues', 'shows', f'venue:{venue_id}',
+                       *(f'artist:{id}' for id in Show.artist_ids_by_venue(venue_id)))
+
+@jobs.task(local=True)
+def evict_artist_pages(artist_id):
+  response_cache.evict('artists', 'shows', f'artist:{artist_id}',
+                       *(f'venue:{id}' for id in Show.venue_ids_by_artist(artist_id)))
+
+@jobs.task
+def send_notification(url, event, payload):
+  body = json.dumps({'event': event, 'data': payload}).encode()
+  notification = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+  with urllib.request.urlopen(notification, timeout=current_app.config['NOTIFY_TIMEOUT']):
+    pass
+
+def notify(event, payload):
+  # one job per webhook, so a failing one is retried on its own
+  for url in current_app.config['NOTIFY_WEBHOOKS']:
+    jobs.submit(send_notification, url, event, payload)
+
+def run_import(kind, stream, format):
+  from importer import Importer
+
+  config = current_app.config
+  importer = Importer(kind, config['IMPORT_BATCH_SIZE'], config['IMPORT_MAX_ERRORS'])
+  report = importer.run(stream, format)
+  # imported shows change the show counts on the venue and artist pages too
+  response_cache.evict('venues', 'artists', 'shows', *(f'venue:{id}' for id in importer.venue_ids),
+                       *(f'artist:{id}' for id in importer.artist_ids))
+  return report
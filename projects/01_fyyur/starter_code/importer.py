@@ -0,0 +1,224 @@
+#----------------------------------------------------------------------------#
+# Bulk import of venues, artists and shows from CSV or NDJSON.
+#
+# Rows are read as a stream and handled in batches of IMPORT_BATCH_SIZE:
+# each row is validated with the same form as the HTML create pages, the
+# valid rows of a batch are written with one executemany INSERT, genre
+# names are resolved to ids once per batch, and the batch is committed.
+# Invalid rows are reported by line number and never stop the import. When
+# the database rejects a batch, its rows are written again one by one,
+# each in a savepoint, so only the rows at fault fail.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from itertools import islice
+
+from werkzeug.datastructures import MultiDict
+
+from forms import ArtistForm, ShowForm, VenueForm
+from models import (Artist, ArtistGenre, Genre, Show, Venue, VenueGenre, db,
+                    name_indexes, rebuild_show_counters)
+
+
+KINDS = {
+    'venues': (Venue, VenueForm, VenueGenre),
+    'artists': (Artist, ArtistForm, ArtistGenre),
+    'shows': (Show, ShowForm, None),
+}
+FORMATS = ('csv', 'ndjson')
+
+
+class InvalidImport(ValueError):
+    pass
+
+
+def read_rows(stream, format):
+    """Yield (line number, MultiDict) for every record of a text stream."""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            formdata = MultiDict()
+            for key, value in row.items():
+                if key == 'genres':
+                    # several genres in one CSV cell: "Jazz|Blues" or "Jazz,Blues"
+                    for genre in value.replace('|', ',').split(','):
+                        if genre.strip():
+                            formdata.add(key, genre.strip())
+                elif key is not None:
+                    formdata.add(key, value)
+            yield reader.line_num, formdata
+    elif format == 'ndjson':
+        for line_num, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield line_num, error
+                continue
+            formdata = MultiDict()
+            for key, value in record.items():
+                for item in value if isinstance(value, list) else [value]:
+                    formdata.add(key, '' if item is None else str(item))
+            yield line_num, formdata
+    else:
+        raise InvalidImport(f'Unknown format {format!r}, expected one of {", ".join(FORMATS)}')
+
+
+class Importer:
+    def __init__(self, kind, batch_size=1000, max_errors=1000):
+        if kind not in KINDS:
+            raise InvalidImport(f'Unknown kind {kind!r}, expected one of {", ".join(KINDS)}')
+        self.kind = kind
+        self.model, form_class, self.genre_model = KINDS[kind]
+        self.form = form_class(formdata=None, meta={'csrf': False})
+        self.columns = [
+            field for field in self.form.data
+            if field in self.model.__table__.columns and field != 'id'
+        ]
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.report = {'kind': kind, 'inserted': 0, 'failed': 0, 'errors': []}
+        self.venue_ids = set()
+        self.artist_ids = set()
+
+    def error(self, line, errors):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < self.max_errors:
+            self.report['errors'].append({'line': line, 'errors': errors})
+
+    def validate(self, rows):
+        # one reused form instance per import, re-processed for every row
+        valid = []
+        for line, formdata in rows:
+            if isinstance(formdata, Exception):
+                self.error(line, {'json': [str(formdata)]})
+                continue
+            self.form.process(formdata)
+            if not self.form.validate():
+                self.error(line, self.form.errors)
+                continue
+            genres = self.form.data.get('genres') or []
+            if self.genre_model is not None:
+                # the form's choices are fixed, the genres table may lack some
+                _, unknown = Genre.match_ids(genres)
+                if unknown:
+                    self.error(line, {'genres': [f'Unknown genres: {", ".join(unknown)}']})
+                    continue
+            valid.append((line, {column: self.form.data[column] for column in self.columns}, genres))
+        return valid
+
+    def check_shows(self, valid):
+        ids_valid = []
+        for line, row, genres in valid:
+            try:
+                row['venue_id'], row['artist_id'] = int(row['venue_id']), int(row['artist_id'])
+            except (TypeError, ValueError):
+                self.error(line, {'venue_id': ['Venue and artist ids must be integers']})
+                continue
+            ids_valid.append((line, row, genres))
+        valid = ids_valid
+
+        # one query per side for the whole batch instead of one per row
+        venue_ids = {row['venue_id'] for _, row, _ in valid}
+        artist_ids = {row['artist_id'] for _, row, _ in valid}
+        venues = {id for (id,) in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids))}
+        artists = {id for (id,) in db.session.query(Artist.id).filter(Artist.id.in_(artist_ids))}
+
+        checked = []
+        for line, row, genres in valid:
+            errors = {}
+            if row['venue_id'] not in venues:
+                errors['venue_id'] = [f"No venue with id {row['venue_id']}"]
+            if row['artist_id'] not in artists:
+                errors['artist_id'] = [f"No artist with id {row['artist_id']}"]
+            if errors:
+                self.error(line, errors)
+            else:
+                checked.append((line, row, genres))
+        return checked
+
+    def write(self, valid):
+        rows = [row for _, row, _ in valid]
+        if self.genre_model is None:
+            db.session.execute(db.insert(self.model), rows)
+            self.venue_ids.update(row['venue_id'] for row in rows)
+            self.artist_ids.update(row['artist_id'] for row in rows)
+            rebuild_show_counters(
+                db.session.connection(),
+                venue_ids={row['venue_id'] for row in rows},
+                artist_ids={row['artist_id'] for row in rows}
+            )
+            return
+
+        ids = db.session.execute(
+            db.insert(self.model).returning(self.model.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        genre_ids = Genre.ids_by_name()
+        genres_by_entity = {
+            id: sorted({genre_ids[genre] for genre in genres if genre in genre_ids})
+            for id, (_, _, genres) in zip(ids, valid)
+        }
+        self.genre_model.sync({id: genres for id, genres in genres_by_entity.items() if genres})
+
+    def run_batch(self, rows):
+        valid = self.validate(rows)
+        if self.kind == 'shows' and valid:
+            valid = self.check_shows(valid)
+        if not valid:
+            return
+        try:
+            self.write(valid)
+            db.session.commit()
+            self.report['inserted'] += len(valid)
+        except Exception:
+            db.session.rollback()
+            # one row the database rejects (too long, a constraint) fails
+            # the whole INSERT: write the rows again one at a time to find it
+            self.write_each(valid)
+
+    def write_each(self, valid):
+        # each row in a savepoint of its own, the rows that pass committed together
+        written = []
+        for line, row, genres in valid:
+            try:
+                with db.session.begin_nested():
+                    self.write([(line, row, genres)])
+            except Exception as error:
+                self.error(line, {'database': [str(getattr(error, 'orig', error))]})
+            else:
+                written.append(line)
+        try:
+            db.session.commit()
+            self.report['inserted'] += len(written)
+        except Exception as error:
+            db.session.rollback()
+            for line in written:
+                self.error(line, {'database': [str(getattr(error, 'orig', error))]})
+
+    def run(self, stream, format):
+        rows = read_rows(stream, format)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.run_batch(batch)
+
+        # bulk inserts skip the mapper events that maintain the search index
+        if self.kind != 'shows':
+            name_indexes.pop(self.model, None)
+        return self.report
+
+
+def detect_format(filename, format=None):
+    if format:
+        return format
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+
+def text_stream(binary):
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
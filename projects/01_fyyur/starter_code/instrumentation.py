@@ -0,0 +1,167 @@
+#----------------------------------------------------------------------------#
+# Per-request query count and latency instrumentation.
+#
+# Every response carries X-Query-Count / X-DB-Time / X-Render-Time and a
+# Server-Timing header, every request is logged as one JSON line, and
+# /metrics serves per-endpoint histograms in the Prometheus text format.
+#----------------------------------------------------------------------------#
+
+import json
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_app_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# upper bounds of the histogram buckets; +Inf is implied
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+HISTOGRAMS = (
+    ('request_duration_seconds', 'wall', SECONDS_BUCKETS),
+    ('db_duration_seconds', 'db', SECONDS_BUCKETS),
+    ('render_duration_seconds', 'render', SECONDS_BUCKETS),
+    ('queries_per_request', 'queries', QUERY_BUCKETS),
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, value, label='endpoint'):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{label}="{value}"}} {self.sum}'
+        yield f'{name}_count{{{label}="{value}"}} {self.count}'
+
+
+def request_stats():
+    # the stats of the request being served, or None outside of one
+    if has_app_context():
+        return g.get('request_stats')
+
+
+class Instrumentation:
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.gauges = {}
+        self.collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.logger = app.logger
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.finish_render, app)
+        # listening on the Engine class covers every engine the app creates
+        if not event.contains(Engine, 'before_cursor_execute', self.start_query):
+            event.listen(Engine, 'before_cursor_execute', self.start_query)
+            event.listen(Engine, 'after_cursor_execute', self.finish_query)
+
+    #  Collection
+    #  ----------------------------------------------------------------
+
+    def start_request(self):
+        g.request_stats = {'start': time.perf_counter(), 'queries': 0, 'db': 0.0, 'render': 0.0}
+
+    def start_query(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def finish_query(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        stats = request_stats()
+        if stats is not None:
+            stats['queries'] += 1
+            stats['db'] += elapsed
+
+    def start_render(self, app, template, context, **extra):
+        stats = request_stats()
+        if stats is not None:
+            stats['render_start'] = time.perf_counter()
+
+    def finish_render(self, app, template, context, **extra):
+        stats = request_stats()
+        if stats is not None and 'render_start' in stats:
+            stats['render'] += time.perf_counter() - stats.pop('render_start')
+
+    def finish_request(self, response):
+        stats = request_stats()
+        if stats is None:
+            return response
+        stats['wall'] = time.perf_counter() - stats['start']
+        endpoint = request.endpoint or 'unmatched'
+
+        response.headers['X-Query-Count'] = str(stats['queries'])
+        response.headers['X-DB-Time'] = f"{stats['db'] * 1000:.2f}ms"
+        response.headers['X-Render-Time'] = f"{stats['render'] * 1000:.2f}ms"
+        response.headers['Server-Timing'] = ', '.join(
+            f'{name};dur={stats[name] * 1000:.2f}' for name in ('db', 'render', 'wall')
+        )
+
+        self.logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'queries': stats['queries'],
+            'db_ms': round(stats['db'] * 1000, 2),
+            'render_ms': round(stats['render'] * 1000, 2),
+            'wall_ms': round(stats['wall'] * 1000, 2),
+        }))
+
+        if endpoint != 'metrics':
+            self.observe(endpoint, stats)
+        return response
+
+    def observe(self, endpoint, stats):
+        with self.lock:
+            histograms = self.histograms.get(endpoint)
+            if histograms is None:
+                histograms = self.histograms[endpoint] = {
+                    key: Histogram(buckets) for _, key, buckets in HISTOGRAMS
+                }
+            for key, histogram in histograms.items():
+                histogram.observe(stats[key])
+
+    #  Export
+    #  ----------------------------------------------------------------
+
+    def gauge(self, name, read):
+        """Export read() as the gauge fyyur_<name>, sampled on every scrape."""
+        self.gauges[name] = read
+
+    def collector(self, collect):
+        """Add the lines collect() yields to every scrape."""
+        self.collectors.append(collect)
+
+    def metrics(self):
+        lines = []
+        with self.lock:
+            for name, key, _ in HISTOGRAMS:
+                lines.append(f'# TYPE fyyur_{name} histogram')
+                for endpoint in sorted(self.histograms):
+                    lines.extend(self.histograms[endpoint][key].lines(f'fyyur_{name}', endpoint))
+        for name, read in sorted(self.gauges.items()):
+            lines.append(f'# TYPE fyyur_{name} gauge')
+            lines.append(f'fyyur_{name} {read()}')
+        for collect in self.collectors:
+            lines.extend(collect())
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
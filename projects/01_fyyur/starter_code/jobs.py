@@ -0,0 +1,286 @@
+#----------------------------------------------------------------------------#
+# In-process background jobs.
+#
+# Work that a write triggers but the response doesn't wait for (show
+# counters, the search index, cache eviction, notifications) is queued as
+# a job after the commit. Jobs are stored in a local SQLite file
+# (JOB_QUEUE_PATH) so they survive a restart, and JOB_WORKERS threads per
+# process run them. A failing job is retried with exponential backoff and
+# moved to the dead_jobs table after JOB_MAX_ATTEMPTS; `flask jobs-retry`
+# puts dead jobs back on the queue.
+#
+# Outside a request (CLI commands, scripts) and with JOB_WORKERS = 0, jobs
+# run inline when they are submitted; only failures are queued.
+#
+# JOB_SCHEDULE runs tasks every so many seconds: the queue holds one job
+# per scheduled task, and running it queues the next. Processes with
+# workers start them at their first request to have these run.
+#
+# Every process that shares the file claims jobs from it. Local tasks are
+# the exception: they update state in the memory of the process that
+# submitted them (the memory cache backend, the SQLite name index), so
+# only that process runs them, and other processes only once it has exited.
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from flask import has_request_context
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    args TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    claimed_at REAL,
+    error TEXT,
+    owner INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_run_at ON jobs (run_at, id);
+CREATE TABLE IF NOT EXISTS dead_jobs (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    args TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+'''
+
+
+class JobQueue:
+    def __init__(self, app=None):
+        self.app = None
+        self.tasks = {}
+        self.local_tasks = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition()
+        self.pid = None
+        self.connection = None
+        self.workers = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.path = app.config['JOB_QUEUE_PATH']
+        self.worker_count = app.config['JOB_WORKERS']
+        self.max_attempts = app.config['JOB_MAX_ATTEMPTS']
+        self.retry_delay = app.config['JOB_RETRY_DELAY']
+        self.timeout = app.config['JOB_TIMEOUT']
+        self.schedule = app.config['JOB_SCHEDULE']
+        # a new app may use another queue file
+        self.connection = None
+        app.before_request(self.start_scheduled)
+
+    def task(self, func=None, local=False):
+        """Register func to be run as a job under its name; local=True keeps its jobs in this process."""
+        if func is None:
+            return lambda func: self.task(func, local)
+        self.tasks[func.__name__] = func
+        if local:
+            self.local_tasks.add(func.__name__)
+        return func
+
+    #  Submission
+    #  ----------------------------------------------------------------
+
+    def submit(self, task, *args):
+        """Run task(*args) in the background; args must be JSON serializable."""
+        name = task if isinstance(task, str) else task.__name__
+        args = json.loads(json.dumps(args))
+        if self.app is None:
+            self.tasks[name](*args)
+        elif self.worker_count == 0 or not has_request_context():
+            error = self.run(name, args, 0)
+            if error is not None:
+                self.enqueue(name, args, 1, self.retry_delay, error)
+        else:
+            self.enqueue(name, args)
+            self.start()
+            with self.wakeup:
+                self.wakeup.notify()
+
+    def enqueue(self, name, args, attempts=0, delay=0, error=None):
+        owner = os.getpid() if name in self.local_tasks else None
+        with self.transaction() as db:
+            db.execute(
+                'INSERT INTO jobs (task, args, attempts, run_at, error, owner) VALUES (?, ?, ?, ?, ?, ?)',
+                (name, json.dumps(args), attempts, time.time() + delay, error, owner)
+            )
+
+    #  Storage
+    #  ----------------------------------------------------------------
+
+    def db(self):
+        # one connection per process, shared by its threads under self.lock
+        if self.connection is None or self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.executescript(SCHEMA)
+            self.add_owner_column()
+            self.pid = os.getpid()
+            self.workers = []
+        return self.connection
+
+    def add_owner_column(self):
+        # queue files created before local tasks existed
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(jobs)')}
+        if 'owner' not in columns:
+            try:
+                self.connection.execute('ALTER TABLE jobs ADD COLUMN owner INTEGER')
+            except sqlite3.OperationalError:
+                pass  # another process added it first
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE, so processes sharing the file never claim the same job
+        with self.lock:
+            db = self.db()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def claim(self):
+        now = time.time()
+        with self.transaction() as db:
+            self.release_orphans(db)
+            row = db.execute(
+                'SELECT id, task, args, attempts FROM jobs WHERE run_at <= ? '
+                'AND (claimed_at IS NULL OR claimed_at < ?) AND (owner IS NULL OR owner = ?) '
+                'ORDER BY run_at, id LIMIT 1',
+                (now, now - self.timeout, self.pid)
+            ).fetchone()
+            if row is not None:
+                db.execute('UPDATE jobs SET claimed_at = ? WHERE id = ?', (now, row[0]))
+        return row
+
+    def release_orphans(self, db):
+        # the local jobs of a process that has exited: its memory is gone,
+        # but whatever else they do (e.g. recount shows) must still happen
+        owners = db.execute('SELECT DISTINCT owner FROM jobs WHERE owner IS NOT NULL AND owner != ?', (self.pid,))
+        for (owner,) in owners.fetchall():
+            if not running(owner):
+                db.execute('UPDATE jobs SET owner = NULL WHERE owner = ?', (owner,))
+
+    def finish(self, id, task, args, attempts, error):
+        with self.transaction() as db:
+            if error is None:
+                db.execute('DELETE FROM jobs WHERE id = ?', (id,))
+            elif attempts >= self.max_attempts:
+                db.execute('DELETE FROM jobs WHERE id = ?', (id,))
+                db.execute(
+                    'INSERT INTO dead_jobs (task, args, attempts, error, failed_at) VALUES (?, ?, ?, ?, ?)',
+                    (task, args, attempts, error, time.time())
+                )
+            else:
+                db.execute(
+                    'UPDATE jobs SET attempts = ?, run_at = ?, claimed_at = NULL, error = ? WHERE id = ?',
+                    (attempts, time.time() + self.retry_delay * 2 ** (attempts - 1), error, id)
+                )
+                return
+            if task in self.schedule:
+                self.plan(db, task, self.schedule[task])
+
+    def plan(self, db, task, delay):
+        # one queued job per scheduled task, however many processes plan it
+        if db.execute('SELECT 1 FROM jobs WHERE task = ? LIMIT 1', (task,)).fetchone() is None:
+            db.execute('INSERT INTO jobs (task, args, run_at) VALUES (?, ?, ?)', (task, '[]', time.time() + delay))
+
+    #  Workers
+    #  ----------------------------------------------------------------
+
+    def start(self):
+        # (re)started lazily, so a forked worker process gets its own threads
+        self.db()
+        if self.workers:
+            return
+        if self.worker_count and self.schedule:
+            with self.transaction() as db:
+                for task in self.schedule:
+                    self.plan(db, task, 0)
+        for n in range(self.worker_count):
+            worker = threading.Thread(target=self.work, name=f'job-worker-{n}', daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def start_scheduled(self):
+        # scheduled jobs need running workers before anything is submitted
+        if self.schedule and self.worker_count and (self.pid != os.getpid() or not self.workers):
+            self.start()
+
+    def work(self):
+        pid = os.getpid()
+        while self.pid == pid:
+            try:
+                job = self.claim()
+            except sqlite3.Error:
+                self.app.logger.warning('Could not read the job queue', exc_info=True)
+                job = None
+            if job is None:
+                with self.wakeup:
+                    self.wakeup.wait(1)
+                continue
+            id, task, args, attempts = job
+            error = self.run(task, json.loads(args), attempts)
+            try:
+                self.finish(id, task, args, attempts + 1, error)
+            except sqlite3.Error:
+                # the job stays claimed, and is claimed again after JOB_TIMEOUT
+                self.app.logger.warning('Could not record job %d as finished', id, exc_info=True)
+
+    def run(self, task, args, attempts):
+        """Run one job; returns None, or the traceback when it failed."""
+        try:
+            with self.app.app_context():
+                self.tasks[task](*args)
+        except Exception:
+            self.app.logger.warning('Job %s%r failed (attempt %d)', task, tuple(args), attempts + 1, exc_info=True)
+            return traceback.format_exc(limit=5)
+        return None
+
+    #  Inspection
+    #  ----------------------------------------------------------------
+
+    def depth(self):
+        with self.lock:
+            return self.db().execute('SELECT count(*) FROM jobs').fetchone()[0]
+
+    def dead_count(self):
+        with self.lock:
+            return self.db().execute('SELECT count(*) FROM dead_jobs').fetchone()[0]
+
+    def retry_dead(self):
+        """Move every dead job back onto the queue; returns how many were."""
+        with self.transaction() as db:
+            db.execute(
+                'INSERT INTO jobs (task, args, attempts, run_at) SELECT task, args, 0, ? FROM dead_jobs',
+                (time.time(),)
+            )
+            return db.execute('DELETE FROM dead_jobs').rowcount
+
+
+def running(pid):
+    # the queue file is local, so its processes all run on this host
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+jobs = JobQueue()
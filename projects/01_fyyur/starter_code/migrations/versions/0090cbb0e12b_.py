@@ -0,0 +1,35 @@
+"""trigram indexes for venue and artist name search
+
+Revision ID: 0090cbb0e12b
+Revises: f729977a5e8b
+Create Date: 2026-10-18 10:12:41.203311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0090cbb0e12b'
+down_revision = 'f729977a5e8b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm lets ILIKE '%term%' and similarity() use a GIN index instead
+    # of a sequential scan. Other databases use search.NgramIndex instead.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_venue_name_trgm', 'Venue', ['name'],
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_artist_name_trgm', 'Artist', ['name'],
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_venue_name_trgm', table_name='Venue')
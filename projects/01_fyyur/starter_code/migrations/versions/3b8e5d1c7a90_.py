@@ -0,0 +1,28 @@
+"""indexes for per-entity genre lookups
+
+Revision ID: 3b8e5d1c7a90
+Revises: 55d10f86acb1
+Create Date: 2026-10-18 16:05:41.218394
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e5d1c7a90'
+down_revision = '55d10f86acb1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the primary keys lead with genre_id; loading an entity's genres and
+    # the scoped DELETE of sync_genres look pairs up by the entity
+    op.create_index('ix_artist_genre_artist_id_genre_id', 'artist_genre', ['artist_id', 'genre_id'])
+    op.create_index('ix_venue_genre_venue_id_genre_id', 'venue_genre', ['venue_id', 'genre_id'])
+
+
+def downgrade():
+    op.drop_index('ix_venue_genre_venue_id_genre_id', table_name='venue_genre')
+    op.drop_index('ix_artist_genre_artist_id_genre_id', table_name='artist_genre')
@@ -0,0 +1,28 @@
+"""row versions for conditional GET
+
+Revision ID: 55d10f86acb1
+Revises: ee713f537748
+Create Date: 2026-10-18 12:31:55.407126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '55d10f86acb1'
+down_revision = 'ee713f537748'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist', 'shows'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+
+
+def downgrade():
+    for table in ('shows', 'Artist', 'Venue'):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
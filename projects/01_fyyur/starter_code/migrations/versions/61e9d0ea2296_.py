@@ -0,0 +1,38 @@
+"""denormalized upcoming/past show counters
+
+Revision ID: 61e9d0ea2296
+Revises: 0090cbb0e12b
+Create Date: 2026-10-18 11:02:17.884106
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '61e9d0ea2296'
+down_revision = '0090cbb0e12b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # start times are naive local times, split against the app's clock like
+    # rebuild_show_counters does; the database's CURRENT_TIMESTAMP is UTC
+    now = datetime.now()
+    for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.execute(sa.text(
+            f'UPDATE "{table}" SET '
+            f'upcoming_shows_count = (SELECT count(*) FROM shows WHERE shows.{key} = "{table}".id AND shows.start_time > :now), '
+            f'past_shows_count = (SELECT count(*) FROM shows WHERE shows.{key} = "{table}".id AND shows.start_time <= :now)'
+        ).bindparams(now=now))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_column(table, 'past_shows_count')
+        op.drop_column(table, 'upcoming_shows_count')
@@ -0,0 +1,25 @@
+"""index for the /shows city filter
+
+Revision ID: c41f2a6e9d15
+Revises: 3b8e5d1c7a90
+Create Date: 2026-10-18 16:24:09.671530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f2a6e9d15'
+down_revision = '3b8e5d1c7a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Show.window() matches the city case-insensitively
+    op.create_index('ix_venue_lower_city', 'Venue', [sa.text('lower(city)')])
+
+
+def downgrade():
+    op.drop_index('ix_venue_lower_city', table_name='Venue')
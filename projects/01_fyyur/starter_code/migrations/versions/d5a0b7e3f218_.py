@@ -0,0 +1,34 @@
+"""keyset pagination over NULL sort keys
+
+Revision ID: d5a0b7e3f218
+Revises: c41f2a6e9d15
+Create Date: 2026-10-18 18:12:40.305217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a0b7e3f218'
+down_revision = 'c41f2a6e9d15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /venues sorts a NULL state or city as '' (models.sort_keys)
+    op.drop_index('ix_venue_state_city', table_name='Venue')
+    op.create_index('ix_venue_state_city', 'Venue',
+                    [sa.text("coalesce(state, '')"), sa.text("coalesce(city, '')"), 'id'])
+    # /shows sorts by start_time, and a show without one can't be listed;
+    # fails while any such show is left
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=True)
+    op.drop_index('ix_venue_state_city', table_name='Venue')
+    op.create_index('ix_venue_state_city', 'Venue', ['state', 'city', 'id'])
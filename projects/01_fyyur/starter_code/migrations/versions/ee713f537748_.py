@@ -0,0 +1,37 @@
+"""indexes for show, location and name lookups
+
+Revision ID: ee713f537748
+Revises: 61e9d0ea2296
+Create Date: 2026-10-18 11:40:03.512870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ee713f537748'
+down_revision = '61e9d0ea2296'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # shows by venue/artist split at a point in time, and the /shows keyset
+    op.create_index('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time'])
+    op.create_index('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time'])
+    op.create_index('ix_shows_start_time_id', 'shows', ['start_time', 'id'])
+    # the /venues directory keyset and get_by_city_state
+    op.create_index('ix_venue_state_city', 'Venue', ['state', 'city', 'id'])
+    # exists() compares lower(name)
+    op.create_index('ix_venue_lower_name', 'Venue', [sa.text('lower(name)')])
+    op.create_index('ix_artist_lower_name', 'Artist', [sa.text('lower(name)')])
+
+
+def downgrade():
+    op.drop_index('ix_artist_lower_name', table_name='Artist')
+    op.drop_index('ix_venue_lower_name', table_name='Venue')
+    op.drop_index('ix_venue_state_city', table_name='Venue')
+    op.drop_index('ix_shows_start_time_id', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_time', table_name='shows')
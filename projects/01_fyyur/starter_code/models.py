@@ -1,9 +1,317 @@
-from datetime import datetime
+import base64
+import json
+import threading
+import time
+from datetime import datetime, timedelta
 
 
+from flask import abort, current_app
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
-db = SQLAlchemy()
+from database import RoutingSession, load_concurrently
+from extensions import response_cache
+from jobs import jobs
+from search import NgramIndex
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# '' as SQL, not as a bound parameter, so that ORDER BY coalesce(city, '')
+# matches the expression of the index on it
+EMPTY = db.literal_column("''")
+
+
+#----------------------------------------------------------------------------#
+# Pagination.
+#----------------------------------------------------------------------------#
+
+def encode_cursor(values):
+    # opaque keyset cursor: the sort key of the last row on a page
+    values = [{'dt': value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, keys):
+    # a cursor must hold one value of the right type per sort key, or the
+    # seek comparison would fail in the database instead of here
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        abort(400)
+    if not isinstance(values, list) or len(values) != len(keys):
+        abort(400)
+
+    decoded = []
+    for value, key in zip(values, keys):
+        expected = key.type.python_type
+        if expected is datetime and isinstance(value, dict):
+            try:
+                value = datetime.fromisoformat(value['dt'])
+            except (KeyError, TypeError, ValueError):
+                abort(400)
+        # JSON true and false pass isinstance(value, int)
+        wrong_type = not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool)
+        if value is not None and wrong_type:
+            abort(400)
+        decoded.append(value)
+    return tuple(decoded)
+
+
+def sort_keys(keys):
+    # a NULL makes the row comparison below unknown, so the seek past a
+    # row with a NULL key would find nothing and end the listing there;
+    # nullable keys, all text, sort as '' instead
+    return [db.func.coalesce(key, EMPTY) if key.nullable else key for key in keys]
+
+
+def paginate(query, keys, cursor=None, limit=None):
+    # seek past the cursor on the sort keys instead of using OFFSET, so every
+    # page is an index range scan of the same cost
+    sorted_by = sort_keys(keys)
+    query = query.order_by(*sorted_by)
+    if limit is None:
+        return query.all(), None
+    if cursor:
+        values = ['' if value is None and key.nullable else value
+                  for value, key in zip(decode_cursor(cursor, keys), keys)]
+        query = query.filter(db.tuple_(*sorted_by) > tuple(values))
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], key.key) for key in keys])
+
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+name_indexes = {}
+
+
+def name_index(model):
+    # this process's own writes reach the index through reindex_names;
+    # it is rebuilt after NAME_INDEX_TTL seconds to pick up other processes'
+    index = name_indexes.get(model)
+    if index is None or time.monotonic() - index.built_at >= current_app.config['NAME_INDEX_TTL']:
+        index = name_indexes[model] = NgramIndex(
+            model.query.with_entities(model.id, model.name).all()
+        )
+    return index
+
+
+def like_pattern(term):
+    # '%term%' with the term's own wildcards matched literally
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def search_by_name(model, term, limit=None):
+    # ranked name matches with their upcoming show counts in one query
+    term = term or ''
+    limit = limit or current_app.config['SEARCH_LIMIT']
+    query = db.session.query(
+        model.id, model.name,
+        model.upcoming_shows_count.label('num_upcoming_shows')
+    )
+
+    if db.engine.dialect.name == 'postgresql':
+        score = db.func.similarity(model.name, term).label('score')
+        rows = query.add_columns(score).filter(
+            model.name.ilike(like_pattern(term), escape='\\')
+        ).order_by(score.desc(), model.id).limit(limit).all()
+        scores = {row.id: row.score for row in rows}
+    else:
+        scores = dict(name_index(model).search(term, limit))
+        rows = query.filter(model.id.in_(scores)).all() if scores else []
+        rows.sort(key=lambda row: (-scores[row.id], row.id))
+
+    return [
+        {
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": row.num_upcoming_shows,
+            "score": scores[row.id]
+        }
+        for row in rows
+    ]
+
+
+#----------------------------------------------------------------------------#
+# Show filters.
+#----------------------------------------------------------------------------#
+
+WINDOWS = ('today', 'tomorrow', 'weekend', 'week', 'month')
+
+
+def date_window(when, now=None):
+    """(start, end) of a named window, from now on: today, tomorrow, weekend, week or month."""
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if when == 'today':
+        return now, today + timedelta(days=1)
+    if when == 'tomorrow':
+        return today + timedelta(days=1), today + timedelta(days=2)
+    if when == 'weekend':
+        # Friday to Sunday night, or what is left of it
+        monday = today + timedelta(days=7 - today.weekday())
+        return max(now, monday - timedelta(days=3)), monday
+    if when == 'week':
+        return now, now + timedelta(days=7)
+    if when == 'month':
+        return now, now + timedelta(days=30)
+    abort(400, f'Unknown window {when!r}, expected one of {", ".join(WINDOWS)}')
+
+
+def parse_date(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, f'Invalid date {value!r}, expected YYYY-MM-DD or YYYY-MM-DDTHH:MM')
+
+
+def show_filters(args):
+    """Show.window() arguments from request args: when or from/to, city, state, genre, venue_id, artist_id."""
+    filters = {}
+    if args.get('when'):
+        filters['start'], filters['end'] = date_window(args['when'])
+    if args.get('from'):
+        filters['start'] = parse_date(args['from'])
+    if args.get('to'):
+        filters['end'] = parse_date(args['to'])
+    for key in ('city', 'state', 'genre'):
+        if args.get(key):
+            filters[key] = args[key]
+    for key in ('venue_id', 'artist_id'):
+        if args.get(key):
+            value = args.get(key, type=int)
+            if value is None:
+                abort(400, f'{key} must be an integer')
+            filters[key] = value
+    return filters
+
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+def page_validators(model, show_key, other, other_key, id):
+    """Everything an entity page renders from, summarized in one small query.
+
+    Returns (validators, last_modified), or None when the entity doesn't
+    exist. validators changes whenever the page would: the entity row, its
+    shows, the other side of those shows, or a show starting and moving
+    from upcoming to past.
+    """
+    row = db.session.query(
+        model.version,
+        model.updated_at,
+        db.func.count(Show.id),
+        db.func.sum(db.case((Show.start_time <= datetime.now(), 1), else_=0)),
+        db.func.max(Show.updated_at),
+        db.func.max(other.updated_at)
+    ).outerjoin(Show, show_key == model.id).outerjoin(
+        other, other.id == other_key
+    ).filter(model.id == id).group_by(model.id).first()
+    if row is None:
+        return None
+
+    version, updated_at, shows, started, shows_updated_at, others_updated_at = row
+    last_modified = max(moment for moment in (updated_at, shows_updated_at, others_updated_at) if moment)
+    return (version, updated_at, shows, started or 0, shows_updated_at, others_updated_at), last_modified
+
+
+#----------------------------------------------------------------------------#
+# Reference data.
+#----------------------------------------------------------------------------#
+
+class UnknownGenres(ValueError):
+    pass
+
+
+class GenreLookup:
+    """Process-wide id <-> name maps of the genres table.
+
+    Reloaded when this process commits a genre (see the events at the end
+    of the file), and after GENRE_CACHE_TTL seconds to pick up genres
+    written by other processes. version counts the reloads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.invalidations = 0
+        self.loaded_at = None
+        self.ids = {}
+        self.names = {}
+
+    def load(self):
+        ttl = current_app.config['GENRE_CACHE_TTL']
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < ttl:
+            return
+        # the query runs outside the lock: on the event loop (asgi.py) it
+        # hands the thread to other requests' greenlets, and one of them
+        # waiting for the lock would block the loop. Concurrent loads just
+        # both query.
+        invalidations = self.invalidations
+        rows = db.session.query(Genre.id, Genre.name).order_by(Genre.id).all()
+        with self.lock:
+            self.ids = {id: name for id, name in rows}
+            self.names = {name: id for id, name in rows}
+            self.version += 1
+            # rows read before an invalidate() are used, but not kept
+            if invalidations == self.invalidations:
+                self.loaded_at = time.monotonic()
+
+    def by_id(self):
+        self.load()
+        return self.ids
+
+    def by_name(self):
+        self.load()
+        return self.names
+
+    def invalidate(self, *args):
+        with self.lock:
+            self.invalidations += 1
+            self.loaded_at = None
+
+
+genre_lookup = GenreLookup()
+
+
+def sync_genres(model, key, genres_by_entity):
+    """Make the genres of every entity in genres_by_entity exactly its list.
+
+    One INSERT ... ON CONFLICT DO NOTHING for the pairs and one DELETE of
+    the entities' other pairs, however many entities are retagged.
+    """
+    if not genres_by_entity:
+        return
+    pairs = [
+        (entity_id, genre_id)
+        for entity_id, genre_ids in genres_by_entity.items()
+        for genre_id in genre_ids
+    ]
+
+    if pairs:
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.session.execute(
+            insert(model).on_conflict_do_nothing(),
+            [{key.key: entity_id, 'genre_id': genre_id} for entity_id, genre_id in pairs]
+        )
+
+    stale = db.session.query(model).filter(key.in_(genres_by_entity))
+    if len(genres_by_entity) == 1:
+        stale = stale.filter(model.genre_id.notin_([genre_id for _, genre_id in pairs]))
+    else:
+        stale = stale.filter(db.tuple_(key, model.genre_id).notin_(pairs))
+    stale.delete(synchronize_session=False)
 
 
 #----------------------------------------------------------------------------#
@@ -27,28 +335,42 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.Text, nullable=True)
     deleted = db.Column(db.Boolean, default=False)
+    # maintained by the Show events below and rebuild_show_counters
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # row version for ETag / Last-Modified on the entity pages
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
+
+    __table_args__ = (
+        # the /venues keyset, see sort_keys()
+        db.Index('ix_venue_state_city', db.func.coalesce(state, EMPTY), db.func.coalesce(city, EMPTY), id),
+        db.Index('ix_venue_lower_name', db.func.lower(name)),
+        # the /shows city filter compares lower(city)
+        db.Index('ix_venue_lower_city', db.func.lower(city)),
+    )
+    __mapper_args__ = {'version_id_col': version}
 
     def __repr__(self):
         return f'<Venue self.name {self.name}>'
     
-    def add_genres(self, items):
-        return [
-            VenueGenre(venue_id=self.id, genre_id=genre)
-            for genre in items
-        ]
-
     def get_genres(self):
         return [genre.name for genre in self.genres]
 
-    def update_genres(self, genres):
-        #  first get the genres already present in database
-        present_genres = VenueGenre.get_genres_ids(venue_id=self.id)
+    @classmethod
+    def get_for_edit(cls, id):
+        # the edit form's data and selected genre ids from one joined query
+        entity = cls.query.options(db.joinedload(cls.genres)).get_or_404(id)
+        details = entity.serialize
+        details['genres'] = [str(genre.id) for genre in entity.genres]
+        return details
 
-        # generate a differnecial list that picks new genres and adds them to the database
-        new_genres = list(set(genres) - set(present_genres))
-        if new_genres:
-            genres_objs = self.add_genres(new_genres)
-            db.session.add_all(genres_objs)
+    def update_genres(self, genre_ids):
+        # replace the venue's genres with the ids from Genre.resolve_ids
+        VenueGenre.sync({self.id: genre_ids})
+        # genres live in their own table, so bump the row version by hand
+        self.updated_at = datetime.utcnow()
 
     def get_enum(self):
         return [
@@ -61,31 +383,21 @@ class Venue(db.Model):
 
     @classmethod
     def get_by_id_full(cls, id):
-        details = {}
-        venue = cls.get_by_id(id)
-        past_shows = Show.get_past_by_venue(id)
-        upcoming_shows = Show.get_upcoming_by_venue(id)
-        details.update(venue)
-        details.update({'upcoming_shows': upcoming_shows})
-        details.update({'upcoming_shows_count': len(upcoming_shows)})
-        details.update({'past_shows': past_shows})
-        details.update({'past_shows_count': len(past_shows)})
+        # one statement for the venue and its genres, one for its shows,
+        # run at the same time on two connections
+        venue, shows = load_concurrently(
+            lambda: cls.query.options(db.joinedload(cls.genres)).get_or_404(id).serialize,
+            lambda: Show.split_by_time(Show.venue_id == id),
+        )
+        return dict(venue, **shows)
 
-        return details
+    @classmethod
+    def page_validators(cls, id):
+        return page_validators(cls, Show.venue_id, Artist, Show.artist_id, id)
 
     @classmethod
-    def name_search(cls, venue_name):
-        venues = cls.query.filter(
-            cls.name.ilike(f'%{venue_name}%')
-        ).all()
-        return [
-            {
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": Show.count_upcoming_by_venue_id(venue.id)
-            }
-            for venue in venues
-        ]
+    def name_search(cls, venue_name, limit=None):
+        return search_by_name(cls, venue_name, limit)
 
     def exists(self, name):
         return self.query.filter(db.func.lower(self.name) == db.func.lower(name)).count()
@@ -96,31 +408,52 @@ class Venue(db.Model):
 
     @classmethod
     def get_by_city_state(cls, state, city):
-        state_venues = cls.query.filter_by(city=city, state=state).all()
+        state_venues = cls.query.filter_by(city=city, state=state).order_by(cls.id).all()
 
         venues = [
             {
                 "id": venue.id,
                 "name": venue.name,
-                "num_upcoming_shows": Show.count_upcoming_by_venue_id(venue.id)
+                "num_upcoming_shows": venue.upcoming_shows_count
             }
             for venue in state_venues
         ]
         return venues
 
     @classmethod
-    def get_all(cls):
-        venues = cls.query.with_entities(cls.city, cls.state).group_by(cls.state, cls.city).all()
-        results = [
-            {
+    def directory_query(cls):
+        return db.session.query(
+            cls.id, cls.name, cls.city, cls.state,
+            cls.upcoming_shows_count.label('num_upcoming_shows')
+        )
+
+    @staticmethod
+    def group_by_area(venues):
+        areas = {}
+        for venue in venues:
+            area = areas.setdefault((venue.city, venue.state), {
                 'city': venue.city,
                 'state': venue.state,
-                'venues': cls.get_by_city_state(state=venue.state, city=venue.city)
-            }
-            for venue in venues
-        ]
+                'venues': []
+            })
+            area['venues'].append({
+                "id": venue.id,
+                "name": venue.name,
+                "num_upcoming_shows": venue.num_upcoming_shows
+            })
 
-        return results
+        return list(areas.values())
+
+    @classmethod
+    def get_all(cls):
+        return cls.get_page()[0]
+
+    @classmethod
+    def get_page(cls, cursor=None, limit=None):
+        venues, next_cursor = paginate(
+            cls.directory_query(), (cls.state, cls.city, cls.id), cursor, limit
+        )
+        return cls.group_by_area(venues), next_cursor
 
     @property
     def serialize(self):
@@ -157,29 +490,38 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.Text)
     website = db.Column(db.String(200))
+    # maintained by the Show events below and rebuild_show_counters
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # row version for ETag / Last-Modified on the entity pages
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
+
+    __table_args__ = (db.Index('ix_artist_lower_name', db.func.lower(name)),)
+    __mapper_args__ = {'version_id_col': version}
 
 
     def __repr__(self):
         return f'<Artist self.id {self.name}>'
 
 
-    def add_genres(self, items):
-        return [
-            ArtistGenre(artist_id=self.id, genre_id=genre)
-            for genre in items
-        ]
-
     def get_genres(self):
         return [genre.name for genre in self.genres]
 
-    def update_genres(self, genres):
-        venue_genres_in_db = ArtistGenre.get_genres_ids(artist_id=self.id)
+    @classmethod
+    def get_for_edit(cls, id):
+        # the edit form's data and selected genre ids from one joined query
+        entity = cls.query.options(db.joinedload(cls.genres)).get_or_404(id)
+        details = entity.serialize
+        details['genres'] = [str(genre.id) for genre in entity.genres]
+        return details
 
-        # generate a list of new genres not in db
-        genres_to_insert = list(set(genres) - set(venue_genres_in_db))
-        if genres_to_insert:
-            genres_objs = self.add_genres(genres_to_insert)
-            db.session.add_all(genres_objs)
+    def update_genres(self, genre_ids):
+        # replace the artist's genres with the ids from Genre.resolve_ids
+        ArtistGenre.sync({self.id: genre_ids})
+        # genres live in their own table, so bump the row version by hand
+        self.updated_at = datetime.utcnow()
 
     @classmethod
     def get_enum(cls):
@@ -192,28 +534,27 @@ class Artist(db.Model):
     def get_by_id(cls, id):
         return cls.query.get_or_404(id)
 
+    @classmethod
+    def get_page(cls, cursor=None, limit=None):
+        return paginate(cls.query.with_entities(cls.id, cls.name), (cls.id,), cursor, limit)
+
     @classmethod
     def get_by_id_full(cls, id):
-        details = {}
-        artist = cls.get_by_id(id)
-        past_shows = Show.get_past_by_venue(id)
-        upcoming_shows = Show.get_upcoming_by_artist(id)
-        details.update(artist.serialize)
-        details.update({'upcoming_shows': upcoming_shows})
-        details.update({'upcoming_shows_count': len(upcoming_shows)})
-        details.update({'past_shows': past_shows})
-        details.update({'past_shows_count': len(past_shows)})
+        # one statement for the artist and its genres, one for its shows,
+        # run at the same time on two connections
+        artist, shows = load_concurrently(
+            lambda: cls.query.options(db.joinedload(cls.genres)).get_or_404(id).serialize,
+            lambda: Show.split_by_time(Show.artist_id == id),
+        )
+        return dict(artist, **shows)
 
-        return details
+    @classmethod
+    def page_validators(cls, id):
+        return page_validators(cls, Show.artist_id, Venue, Show.venue_id, id)
 
     @classmethod
-    def search_artist_name(cls, name):
-        artists = cls.query.filter(cls.name.ilike(f'%{name}%')).outerjoin(Show, cls.id == Show.artist_id).all()
-        return [{
-            "id": artist.id,
-            "name": artist.name,
-            "num_upcoming_shows": artist.num_upcoming_shows
-        } for artist in artists]
+    def search_artist_name(cls, name, limit=None):
+        return search_by_name(cls, name, limit)
 
     @classmethod
     def exists(cls, name):
@@ -221,13 +562,11 @@ class Artist(db.Model):
 
     @property
     def num_upcoming_shows(self):
-        return self.query.join(Show).filter_by(artist_id=self.id).filter(
-            Show.start_time > datetime.now()).count()
+        return self.upcoming_shows_count
 
     @property
     def num_past_shows(self):
-        return self.query.join(Show).filter_by(artist_id=self.id).filter(
-            Show.start_time < datetime.now()).count()
+        return self.past_shows_count
 
     @property
     def past_shows(self):
@@ -261,43 +600,138 @@ class Show(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     artist_id= db.Column(db.Integer, db.ForeignKey('Artist.id'))
     venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'))
-    start_time = db.Column(db.DateTime)
+    start_time = db.Column(db.DateTime, nullable=False)
     artist = db.relationship('Artist', viewonly=True)
     venue = db.relationship('Venue', viewonly=True)
+    # row version for ETag / Last-Modified on the entity pages
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', venue_id, start_time),
+        db.Index('ix_shows_artist_id_start_time', artist_id, start_time),
+        db.Index('ix_shows_start_time_id', start_time, id),
+    )
+    __mapper_args__ = {'version_id_col': version}
 
     def __repr__(self):
         return f'<Show id: {self.id} artist_id:{self.artist_id} venue_id: {self.venue_id}'
     @classmethod
-    def count_upcoming_by_venue_id(cls, venue_id):
-        return cls.query.filter_by(venue_id=venue_id).filter(cls.start_time > datetime.now()).count()
-
-    @classmethod
-    def count_past_by_venue_id(cls, venue_id):
-        return cls.query.filter_by(venue_id=venue_id).filter(cls.start_time < datetime.now()).count()
-
-    @classmethod
     def get_past_by_venue(cls, venue_id):
-        shows = cls.query.filter_by(venue_id=venue_id).filter(cls.start_time < datetime.now()).all()
-        return [show.show_details for show in shows]
+        return cls.get_details(cls.venue_id == venue_id, cls.start_time < datetime.now())
 
     @classmethod
     def get_past_by_artist(cls, artist_id):
-        shows = cls.query.filter_by(artist_id=artist_id).filter(cls.start_time < datetime.now()).all()
-        return [show.show_details for show in shows]
+        return cls.get_details(cls.artist_id == artist_id, cls.start_time < datetime.now())
 
     @classmethod
     def get_upcoming_by_venue(cls, venue_id):
-        shows = cls.query.filter_by(venue_id=venue_id).filter(Show.start_time > datetime.now()).all()
-        return [show.show_details for show in shows]
+        return cls.get_details(cls.venue_id == venue_id, cls.start_time > datetime.now())
 
     @classmethod
     def get_upcoming_by_artist(cls, artist_id):
-        shows = cls.query.filter_by(artist_id=artist_id).filter(Show.start_time > datetime.now()).all()
-        return [show.show_details for show in shows]
+        return cls.get_details(cls.artist_id == artist_id, cls.start_time > datetime.now())
 
     @classmethod
     def get_all(cls):
-        return [show.show_details for show in cls.query.order_by(cls.venue_id.desc()).all()]
+        return cls.get_details(order_by=cls.venue_id.desc())
+
+    @classmethod
+    def artist_ids_by_venue(cls, venue_id):
+        return [id for (id,) in db.session.query(cls.artist_id).filter_by(venue_id=venue_id).distinct()]
+
+    @classmethod
+    def venue_ids_by_artist(cls, artist_id):
+        return [id for (id,) in db.session.query(cls.venue_id).filter_by(artist_id=artist_id).distinct()]
+
+    @classmethod
+    def split_by_time(cls, *criteria):
+        # fetch the shows once and partition them against a single timestamp
+        now = datetime.now()
+        past_shows, upcoming_shows = [], []
+        for show in cls.details_query().filter(*criteria).order_by(cls.start_time):
+            if show.start_time > now:
+                upcoming_shows.append(cls.row_details(show))
+            else:
+                past_shows.append(cls.row_details(show))
+
+        return {
+            'upcoming_shows': upcoming_shows,
+            'upcoming_shows_count': len(upcoming_shows),
+            'past_shows': past_shows,
+            'past_shows_count': len(past_shows)
+        }
+
+    @classmethod
+    def get_page(cls, cursor=None, limit=None, criteria=()):
+        shows, next_cursor = paginate(cls.details_query().filter(*criteria), (cls.start_time, cls.id), cursor, limit)
+        return [cls.row_details(show) for show in shows], next_cursor
+
+    @classmethod
+    def window(cls, start=None, end=None, city=None, state=None, genre=None, venue_id=None, artist_id=None):
+        """Criteria for details_query(): shows starting in [start, end) that match every filter given.
+
+        The time range is a range scan of ix_shows_start_time_id, or of the
+        venue/artist start_time index when one of those ids is given; the
+        city is looked up in ix_venue_lower_city. Unknown genres are a 400.
+        """
+        criteria = []
+        if start is not None:
+            criteria.append(cls.start_time >= start)
+        if end is not None:
+            criteria.append(cls.start_time < end)
+        if venue_id is not None:
+            criteria.append(cls.venue_id == venue_id)
+        if artist_id is not None:
+            criteria.append(cls.artist_id == artist_id)
+        # details_query() joins the venue, so its columns can be filtered on
+        if city:
+            criteria.append(db.func.lower(Venue.city) == city.lower())
+        if state:
+            criteria.append(Venue.state == state.upper())
+        if genre:
+            genre_ids = {name.lower(): id for name, id in genre_lookup.by_name().items()}
+            genre_id = genre_ids.get(genre.lower())
+            if genre_id is None:
+                abort(400, f'Unknown genre {genre!r}')
+            criteria.append(cls.artist_id.in_(
+                db.select(ArtistGenre.artist_id).where(ArtistGenre.genre_id == genre_id)
+            ))
+        return criteria
+
+    @classmethod
+    def details_query(cls):
+        # shows joined to their artist and venue columns, so serializing a
+        # row never lazy loads a relationship
+        return db.session.query(
+            cls.id,
+            cls.venue_id,
+            Venue.name.label('venue_name'),
+            cls.artist_id,
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'),
+            cls.start_time
+        ).join(Venue, cls.venue_id == Venue.id).join(Artist, cls.artist_id == Artist.id)
+
+    @classmethod
+    def get_details(cls, *criteria, order_by=None):
+        query = cls.details_query().filter(*criteria)
+        if order_by is None:
+            order_by = cls.start_time
+        return [cls.row_details(row) for row in query.order_by(order_by).all()]
+
+    @staticmethod
+    def row_details(row):
+        return {
+            'id': row.id,
+            'venue_id': row.venue_id,
+            'venue_name': row.venue_name,
+            "artist_id": row.artist_id,
+            "artist_name": row.artist_name,
+            "artist_image_link": row.artist_image_link,
+            'start_time': row.start_time.strftime("%m/%d/%Y, %H:%M")
+        }
 
     @property
     def show_details(self):
@@ -321,7 +755,37 @@ class Genre(db.Model):
 
     @classmethod
     def get_enum(cls):
-        return [(genre.id, genre.name) for genre in cls.query.all()]
+        return list(genre_lookup.by_id().items())
+
+    @classmethod
+    def ids_by_name(cls):
+        return genre_lookup.by_name()
+
+    @classmethod
+    def resolve_ids(cls, genres):
+        # form values are genre ids on the edit forms and names on the create forms
+        genres = [str(genre) for genre in genres]
+        ids, unknown = cls.match_ids(genres)
+        if unknown:
+            # another process may have added them since the maps were loaded
+            genre_lookup.invalidate()
+            ids, unknown = cls.match_ids(genres)
+        if unknown:
+            raise UnknownGenres(f'Unknown genres: {", ".join(unknown)}')
+        return sorted(ids)
+
+    @classmethod
+    def match_ids(cls, genres):
+        by_id, by_name = genre_lookup.by_id(), genre_lookup.by_name()
+        ids, unknown = set(), []
+        for genre in genres:
+            if genre.isdigit() and int(genre) in by_id:
+                ids.add(int(genre))
+            elif genre in by_name:
+                ids.add(by_name[genre])
+            else:
+                unknown.append(genre)
+        return ids, unknown
 
     def details(self):
         return {
@@ -342,17 +806,15 @@ class ArtistGenre(db.Model):
     genre = db.relationship('Genre', backref=db.backref('artist_genre', cascade='all, delete-orphan'))
     artist = db.relationship('Artist', backref=db.backref('artist_genre', cascade='all, delete-orphan'))
 
-    __table_args__ = (db.UniqueConstraint(genre_id, artist_id),)
-
-    @classmethod
-    def delete_old(cls, artist_id, genres):
-        venues_to_delete = db.session.query(cls).filter_by(artist_id=artist_id).filter(cls.genre_id.notin_(genres))
-        venues_to_delete.delete(synchronize_session=False)
+    # the primary key leads with genre_id; an artist's genres need this one
+    __table_args__ = (
+        db.UniqueConstraint(genre_id, artist_id),
+        db.Index('ix_artist_genre_artist_id_genre_id', artist_id, genre_id),
+    )
 
     @classmethod
-    def get_genres_ids(cls, artist_id):
-        results = cls.query.filter_by(artist_id=artist_id).all()
-        return [str(result.genre_id) for result in results]
+    def sync(cls, genres_by_artist):
+        sync_genres(cls, cls.artist_id, genres_by_artist)
 
     def __repr__(self):
         return f'<ArtistGenre artist {self.artist_id} genre {self.artist_id}>'
@@ -367,17 +829,157 @@ class VenueGenre(db.Model):
     genre = db.relationship('Genre', backref=db.backref('venue_genre', cascade='all, delete-orphan'))
     venue = db.relationship('Venue', backref=db.backref('venue_genre', cascade='all, delete-orphan'))
 
-    __table_args__ = (db.UniqueConstraint(genre_id, venue_id),)
+    # the primary key leads with genre_id; a venue's genres need this one
+    __table_args__ = (
+        db.UniqueConstraint(genre_id, venue_id),
+        db.Index('ix_venue_genre_venue_id_genre_id', venue_id, genre_id),
+    )
 
     @classmethod
-    def delete_old(cls, venue_id, genres):
-        venues_to_delete = db.session.query(cls).filter_by(venue_id=venue_id).filter(cls.genre_id.notin_(genres))
-        venues_to_delete.delete(synchronize_session=False)
-
-    @classmethod
-    def get_genres_ids(cls, venue_id):
-        results = cls.query.filter_by(venue_id=venue_id).all()
-        return [str(result.genre_id) for result in results]
+    def sync(cls, genres_by_venue):
+        sync_genres(cls, cls.venue_id, genres_by_venue)
 
     def __repr__(self):
-        return f'<VenreGenre venue {self.venue_id} genre {self.genre_id}>'
\ No newline at end of file
+        return f'<VenreGenre venue {self.venue_id} genre {self.genre_id}>'
+
+
+#----------------------------------------------------------------------------#
+# Events.
+#
+# Flushes only note which rows they touched. Once the transaction commits,
+# the show counters and search index of those rows are refreshed by a
+# background job (see jobs.py), so the write doesn't wait for them. The
+# counter job also evicts the cached pages that show those counters. Both
+# are local tasks: the search index and the memory cache they update are
+# those of the process that wrote the rows. A written genre invalidates the
+# genre maps at the same point.
+#----------------------------------------------------------------------------#
+
+def touched(target):
+    return db.inspect(target).session.info.setdefault('touched', {
+        'venue_ids': set(), 'artist_ids': set(), 'Venue': set(), 'Artist': set(), 'genres': False
+    })
+
+
+def index_name(mapper, connection, target):
+    if type(target) in name_indexes:
+        touched(target)[type(target).__name__].add(target.id)
+
+
+for model in (Venue, Artist):
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(model, event_name, index_name)
+
+
+@jobs.task(local=True)
+def reindex_names(model_name, ids):
+    model = {'Venue': Venue, 'Artist': Artist}[model_name]
+    index = name_indexes.get(model)
+    if index is None:
+        return
+    names = dict(db.session.query(model.id, model.name).filter(model.id.in_(ids)))
+    for id in ids:
+        if id in names:
+            index.add(id, names[id])
+        else:
+            index.remove(id)
+
+
+def count_shows(show_key, model, upcoming):
+    now = datetime.now()
+    return db.select(db.func.count(Show.id)).where(
+        show_key == model.id,
+        Show.start_time > now if upcoming else Show.start_time <= now
+    ).scalar_subquery()
+
+
+def rebuild_show_counters(connection, venue_ids=None, artist_ids=None):
+    """Recount upcoming/past shows from the shows table.
+
+    Only rows whose counters disagree are written; returns the ids of the
+    venues and of the artists that were. Limited to the given ids, or
+    every venue and artist when they are None.
+    """
+    updated = []
+    for model, show_key, ids in ((Venue, Show.venue_id, venue_ids), (Artist, Show.artist_id, artist_ids)):
+        if ids is not None and not ids:
+            updated.append([])
+            continue
+        upcoming = count_shows(show_key, model, upcoming=True)
+        past = count_shows(show_key, model, upcoming=False)
+        statement = db.update(model).where(db.or_(
+            model.upcoming_shows_count != upcoming,
+            model.past_shows_count != past
+        )).values(upcoming_shows_count=upcoming, past_shows_count=past).returning(model.id)
+        if ids is not None:
+            statement = statement.where(model.id.in_(ids))
+        updated.append(sorted(connection.execute(statement).scalars()))
+    venue_ids, artist_ids = updated
+    return venue_ids, artist_ids
+
+
+def evict_counter_pages(venue_ids, artist_ids):
+    # the listings and pages that show upcoming/past show counts
+    response_cache.evict('venues', 'artists', 'shows', *(f'venue:{id}' for id in venue_ids),
+                         *(f'artist:{id}' for id in artist_ids))
+
+
+@jobs.task
+def rebuild_all_show_counters():
+    """Recount every venue's and artist's shows, see JOB_SCHEDULE; returns the ids changed."""
+    with db.engine.begin() as connection:
+        venue_ids, artist_ids = rebuild_show_counters(connection)
+    evict_counter_pages(venue_ids, artist_ids)
+    return venue_ids, artist_ids
+
+
+def show_keys(target, key):
+    # current and previous values of a show's foreign key
+    history = db.inspect(target).attrs[key].history
+    return {id for id in (getattr(target, key), *history.deleted) if id is not None}
+
+
+def count_show(mapper, connection, target):
+    touched(target)['venue_ids'].update(show_keys(target, 'venue_id'))
+    touched(target)['artist_ids'].update(show_keys(target, 'artist_id'))
+
+
+@jobs.task(local=True)
+def refresh_show_counters(venue_ids, artist_ids):
+    with db.engine.begin() as connection:
+        rebuild_show_counters(connection, venue_ids=venue_ids, artist_ids=artist_ids)
+    # evicted once the counters are written: a page cached before then
+    # would keep the old counts for CACHE_TTL
+    evict_counter_pages(venue_ids, artist_ids)
+
+
+def write_genre(mapper, connection, target):
+    touched(target)['genres'] = True
+
+
+for event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Show, event_name, count_show)
+    event.listen(Genre, event_name, write_genre)
+
+
+def submit_touched(session):
+    touched = session.info.pop('touched', None)
+    if touched is None:
+        return
+    # only now: a reader reloading before the commit would keep the old
+    # genres for GENRE_CACHE_TTL, and a rollback leaves them as they were
+    if touched['genres']:
+        genre_lookup.invalidate()
+    if touched['venue_ids'] or touched['artist_ids']:
+        jobs.submit(refresh_show_counters, sorted(touched['venue_ids']), sorted(touched['artist_ids']))
+    for model_name in ('Venue', 'Artist'):
+        if touched[model_name]:
+            jobs.submit(reindex_names, model_name, sorted(touched[model_name]))
+
+
+def forget_touched(session):
+    session.info.pop('touched', None)
+
+
+event.listen(db.session, 'after_commit', submit_touched)
+event.listen(db.session, 'after_rollback', forget_touched)
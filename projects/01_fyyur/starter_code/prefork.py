@@ -0,0 +1,106 @@
+#----------------------------------------------------------------------------#
+# Pre-fork serving.
+#
+# A pre-fork server that preloads the app (gunicorn --preload, see
+# gunicorn.conf.py) builds it once in the master and forks the workers
+# from it, so the workers share the master's memory pages until they
+# write to them. CPython writes to an object whenever it changes its
+# reference count or the garbage collector visits it, so:
+#
+#   preload()      imports what the app otherwise imports on first use
+#                  (forms, importer, calendars), so it is shared as well
+#   before_fork()  moves every object into the permanent generation with
+#                  gc.freeze(), which the collector of a worker never visits
+#   after_fork()   gives the worker its own connection pools; connections
+#                  must never be shared between processes
+#
+# `python prefork.py MASTER_PID` reports how much of each worker's memory
+# is still shared with its siblings and how much has become private.
+#----------------------------------------------------------------------------#
+
+import gc
+import os
+import sys
+
+
+def preload(app):
+    """Load everything the workers would otherwise load separately."""
+    import dateutil.parser
+    import calendars
+    import forms
+    import importer
+    if not app.config['TEMPLATE_WARMUP']:
+        from app import warm_templates
+        warm_templates(app)
+    # the master doesn't serve requests; collecting in it would only leave
+    # holes that the workers' allocations then fill, dirtying shared pages
+    gc.disable()
+
+
+def before_fork():
+    gc.freeze()
+
+
+def after_fork(app):
+    from models import db
+
+    # close=False leaves the master's connections alone, the worker just
+    # stops using them
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    gc.enable()
+
+
+#  Memory report
+#  ----------------------------------------------------------------
+
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def memory(pid):
+    """The process's smaps_rollup totals, in kB."""
+    usage = {}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            field, _, value = line.partition(':')
+            if field in SMAPS_FIELDS:
+                usage[field] = int(value.split()[0])
+    return usage
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                # the command in field 2 may contain spaces; the parent pid
+                # is the second field after it
+                parent = int(stat.read().rpartition(')')[2].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == pid:
+            found.append(int(entry))
+    return sorted(found)
+
+
+def memory_report(master):
+    yield f"{'pid':>8} {'rss MB':>8} {'pss MB':>8} {'shared MB':>10} {'private MB':>11} {'shared %':>9}"
+    for pid in [master] + children(master):
+        try:
+            usage = memory(pid)
+        except OSError:
+            continue  # exited meanwhile
+        shared = usage['Shared_Clean'] + usage['Shared_Dirty']
+        private = usage['Private_Clean'] + usage['Private_Dirty']
+        name = 'master' if pid == master else str(pid)
+        yield (f"{name:>8} {usage['Rss'] / 1024:8.1f} {usage['Pss'] / 1024:8.1f} {shared / 1024:10.1f} "
+               f"{private / 1024:11.1f} {shared / max(usage['Rss'], 1):9.0%}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit('usage: python prefork.py MASTER_PID')
+    print('\n'.join(memory_report(int(sys.argv[1]))))
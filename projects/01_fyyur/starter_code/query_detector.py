@@ -0,0 +1,119 @@
+#----------------------------------------------------------------------------#
+# N+1 query detection for debug and test runs.
+#
+# Every statement of a request is fingerprinted (literals and IN lists
+# normalized away). A fingerprint seen more than N_PLUS_ONE_THRESHOLD times
+# in one request is reported with the app function that issued it: logged
+# as a warning in debug mode, raised as NPlusOneError when app.testing.
+#----------------------------------------------------------------------------#
+
+import os
+import re
+import sys
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+NORMALIZERS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+|\[POSTCOMPILE_\w+\]|__\[POSTCOMPILE_\w+\])(?:\s*,\s*[^)]+)*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(statement):
+    for pattern, replacement in NORMALIZERS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+class QueryDetector:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not (app.debug or app.testing):
+            return
+        self.app = app
+        self.root = app.root_path + os.sep
+        app.before_request(self.start_request)
+        app.after_request(self.check_request)
+        if not event.contains(Engine, 'before_cursor_execute', self.record):
+            event.listen(Engine, 'before_cursor_execute', self.record)
+
+    def start_request(self):
+        # checked per request so a benchmark can switch debug off afterwards
+        if self.app.debug or self.app.testing:
+            g.query_fingerprints = {}
+
+    def caller(self):
+        # innermost frame from the app's own modules, e.g. Venue.name_search
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(self.root) and filename != __file__:
+                name = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+                return f'{name} ({os.path.basename(filename)}:{frame.f_lineno})'
+            frame = frame.f_back
+        return 'unknown'
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if not has_app_context():
+            return
+        fingerprints = g.get('query_fingerprints')
+        if fingerprints is None:
+            return
+        key = fingerprint(statement)
+        if key in fingerprints:
+            fingerprints[key][0] += 1
+        else:
+            fingerprints[key] = [1, self.caller()]
+
+    def check_request(self, response):
+        fingerprints = g.pop('query_fingerprints', None) or {}
+        threshold = self.app.config['N_PLUS_ONE_THRESHOLD']
+        repeated = [
+            f'{count}x from {caller}: {statement}'
+            for statement, (count, caller) in fingerprints.items()
+            if count > threshold
+        ]
+        if not repeated:
+            return response
+
+        message = f'N+1 queries on {request.method} {request.path}:\n  ' + '\n  '.join(repeated)
+        if self.app.testing:
+            raise NPlusOneError(message)
+        self.app.logger.warning(message)
+        response.headers['X-N-Plus-One'] = str(len(repeated))
+        return response
+
+
+def merge_fingerprints(fingerprints, other):
+    """Add the statements other recorded, e.g. on another thread, to fingerprints."""
+    for key, (count, caller) in other.items():
+        if key in fingerprints:
+            fingerprints[key][0] += count
+        else:
+            fingerprints[key] = [count, caller]
+
+
+def query_count(client, url):
+    response = client.get(url)
+    return int(response.headers['X-Query-Count'])
+
+
+def assert_constant_queries(client, url, grow):
+    """Fail when the queries url runs grow with the data added by grow()."""
+    before = query_count(client, url)
+    grow()
+    after = query_count(client, url)
+    if after > before:
+        raise NPlusOneError(f'{url} ran {before} queries, then {after} after more data was added')
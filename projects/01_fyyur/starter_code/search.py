@@ -0,0 +1,74 @@
+#----------------------------------------------------------------------------#
+# In-process trigram index.
+#
+# Postgres answers name searches from the pg_trgm indexes added in migration
+# 0090cbb0e12b. Other databases (the SQLite setups used for local testing)
+# have no trigram support, so the models fall back to this index instead of
+# scanning the table with LIKE '%term%'.
+#----------------------------------------------------------------------------#
+
+import threading
+import time
+
+
+def trigrams(text, padded=True):
+    text = text.lower()
+    if padded:
+        # pad like pg_trgm so word boundaries score higher
+        text = f'  {text} '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NgramIndex:
+    def __init__(self, rows=()):
+        # updated by background jobs while requests search it
+        self.lock = threading.RLock()
+        self.names = {}
+        self.postings = {}
+        for id, name in rows:
+            self.add(id, name)
+        self.built_at = time.monotonic()
+
+    def add(self, id, name):
+        with self.lock:
+            self.remove(id)
+            name = (name or '').lower()
+            self.names[id] = name
+            for gram in trigrams(name):
+                self.postings.setdefault(gram, set()).add(id)
+
+    def remove(self, id):
+        with self.lock:
+            name = self.names.pop(id, None)
+            if name is None:
+                return
+            for gram in trigrams(name):
+                ids = self.postings.get(gram)
+                if ids is not None:
+                    ids.discard(id)
+                    if not ids:
+                        del self.postings[gram]
+
+    def search(self, term, limit=None):
+        """Return [(id, score)] for names containing term, best match first."""
+        term = term.lower()
+        grams = trigrams(term, padded=False)
+        with self.lock:
+            if grams:
+                candidates = set.intersection(*(self.postings.get(gram, set()) for gram in grams))
+            else:
+                # terms shorter than a trigram can't use the postings
+                candidates = set(self.names)
+            names = {id: self.names[id] for id in candidates}
+
+        term_grams = trigrams(term)
+        results = []
+        for id, name in names.items():
+            if term not in name:
+                continue
+            name_grams = trigrams(name)
+            score = len(name_grams & term_grams) / len(name_grams | term_grams)
+            results.append((id, score))
+
+        results.sort(key=lambda result: (-result[1], result[0]))
+        return results[:limit] if limit else results
@@ -0,0 +1,125 @@
+#----------------------------------------------------------------------------#
+# Synthetic data generator.
+#
+#   $ python seed.py --venues 2000 --artists 5000 --shows 100000
+#
+# Appends random venues, artists, shows and genre tags to the configured
+# database. Point config.py at a throwaway database before running it.
+#----------------------------------------------------------------------------#
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from forms import VenueForm
+from models import Artist, ArtistGenre, Genre, Show, Venue, VenueGenre, db, name_indexes, rebuild_show_counters
+
+
+CITIES = [
+    ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('New York', 'NY'), ('Brooklyn', 'NY'),
+    ('Austin', 'TX'), ('Houston', 'TX'), ('Chicago', 'IL'), ('Seattle', 'WA'),
+    ('Portland', 'OR'), ('Nashville', 'TN'), ('New Orleans', 'LA'), ('Denver', 'CO'),
+]
+WORDS = [
+    'Blue', 'Velvet', 'Electric', 'Wild', 'Silver', 'Midnight', 'Golden', 'Hollow',
+    'Crimson', 'Lucky', 'Neon', 'Rusty', 'Sax', 'Piano', 'Garden', 'Echo',
+]
+VENUE_KINDS = ['Hall', 'Bar', 'Lounge', 'Club', 'Theatre', 'Room', 'Cafe']
+ARTIST_KINDS = ['Band', 'Trio', 'Collective', 'Project', 'Orchestra', 'Duo']
+
+BATCH_SIZE = 1000
+
+
+def insert_batches(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+
+
+def new_ids(model, count):
+    return [id for (id,) in db.session.query(model.id).order_by(model.id.desc()).limit(count)]
+
+
+def ensure_genres():
+    names = [name for name, _ in VenueForm.genres.kwargs['choices']]
+    present = {genre.name for genre in Genre.query.all()}
+    insert_batches(Genre, [{'name': name} for name in names if name not in present])
+    return [id for (id,) in db.session.query(Genre.id)]
+
+
+def entity_row(rng, kinds, n):
+    city, state = rng.choice(CITIES)
+    return {
+        'name': f'{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(kinds)} {n}',
+        'city': city,
+        'state': state,
+        'phone': f'{rng.randint(200, 999)}-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+        'image_link': f'https://picsum.photos/seed/{n}/300/300',
+        'facebook_link': f'https://www.facebook.com/fyyur{n}',
+    }
+
+
+def seed(venues=100, artists=200, shows=2000, genres_per_entity=3, random_seed=0):
+    rng = random.Random(random_seed)
+    genre_ids = ensure_genres()
+    offset = db.session.query(db.func.count(Venue.id)).scalar() + db.session.query(db.func.count(Artist.id)).scalar()
+
+    insert_batches(Venue, [
+        dict(entity_row(rng, VENUE_KINDS, offset + n), address=f'{rng.randint(1, 999)} Main Street')
+        for n in range(venues)
+    ])
+    insert_batches(Artist, [
+        entity_row(rng, ARTIST_KINDS, offset + venues + n)
+        for n in range(artists)
+    ])
+    venue_ids = new_ids(Venue, venues)
+    artist_ids = new_ids(Artist, artists)
+
+    insert_batches(VenueGenre, [
+        {'venue_id': venue_id, 'genre_id': genre_id}
+        for venue_id in venue_ids
+        for genre_id in rng.sample(genre_ids, min(genres_per_entity, len(genre_ids)))
+    ])
+    insert_batches(ArtistGenre, [
+        {'artist_id': artist_id, 'genre_id': genre_id}
+        for artist_id in artist_ids
+        for genre_id in rng.sample(genre_ids, min(genres_per_entity, len(genre_ids)))
+    ])
+
+    # a year either side of today, on the hour
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    if venue_ids and artist_ids:
+        insert_batches(Show, [
+            {
+                'venue_id': rng.choice(venue_ids),
+                'artist_id': rng.choice(artist_ids),
+                'start_time': now + timedelta(hours=rng.randint(-365 * 24, 365 * 24))
+            }
+            for _ in range(shows)
+        ])
+
+    # bulk inserts skip the mapper events that maintain these
+    rebuild_show_counters(db.session.connection())
+    name_indexes.clear()
+    db.session.commit()
+
+
+def main():
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Seed the configured database with synthetic data.')
+    parser.add_argument('--venues', type=int, default=100)
+    parser.add_argument('--artists', type=int, default=200)
+    parser.add_argument('--shows', type=int, default=2000)
+    parser.add_argument('--genres-per-entity', type=int, default=3)
+    parser.add_argument('--random-seed', type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(args.venues, args.artists, args.shows, args.genres_per_entity, args.random_seed)
+        print(f'Added {args.venues} venues, {args.artists} artists and {args.shows} shows')
+
+
+if __name__ == '__main__':
+    main()
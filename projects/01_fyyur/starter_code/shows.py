@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# Show pages.
+#
+# The filtered show listing and the create show form. The form is imported
+# by the views that use it.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, flash
+
+from extensions import response_cache
+from helpers import next_page_url, notify, page_args
+from models import Genre, Show, WINDOWS, db, show_filters
+
+
+blueprint = Blueprint('shows', __name__)
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@blueprint.route('/shows')
+@response_cache.cached('shows')
+def shows():
+  # displays list of shows at /shows
+  # TODO: replace with real venues data.
+  #       num_shows should be aggregated based on number of upcoming shows per venue.
+  cursor, limit = page_args()
+  filters = show_filters(request.args)
+  data, next_cursor = Show.get_page(cursor, limit, Show.window(**filters))
+  return render_template('pages/shows.html', shows=data, next_url=next_page_url(next_cursor, limit),
+                         windows=WINDOWS, genres=Genre.get_enum(), filters=request.args)
+ 
+
+@blueprint.route('/shows/create')
+def create_shows():
+  from forms import ShowForm
+
+  # renders form. do not touch.
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@blueprint.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead
+    try:
+      artist_id = int(request.form['artist_id'])
+      venue_id = int(request.form['venue_id'])
+      # the form posts '%Y-%m-%d %H:%M:%S'; SQLite won't take it as a string
+      start_time = datetime.fromisoformat(request.form['start_time'])
+      show = Show(artist_id = artist_id,venue_id=venue_id,start_time=start_time)
+      db.session.add(show)
+      db.session.flush()
+      created = {'id': show.id, 'venue_id': venue_id, 'artist_id': artist_id}
+      # the commit queues the show counter refresh, which evicts the
+      # venue, artist and show pages once the counts are written
+      db.session.commit()
+      notify('show.created', created)
+      
+      # return render_template('pages/shows.html')
+      flash('You have added a new show')
+
+    except:
+      db.session.rollback()
+      flash('An error occurred. Show could not be listed.')
+      print('failed')
+
+    finally:
+      return render_template('pages/home.html')
+      print('the final statement in try catch')
+  # on successful db insert, flash success
+  # flash('Show was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead.
+  # e.g., flash('An error occurred. Show could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  # return render_template('pages/home.html')
@@ -0,0 +1,59 @@
+#----------------------------------------------------------------------------#
+# The JSON API (api.py).
+#----------------------------------------------------------------------------#
+
+import pytest
+
+from models import Show, db
+
+
+def test_list_pages(client, add_rows):
+    add_rows(2)
+    first = client.get('/api/v1/venues', query_string={'limit': 2}).get_json()
+    assert [venue['id'] for venue in first['data']] == [1, 2]
+    assert sorted(first['data'][0]['genres']) == ['Folk', 'Jazz']
+    assert first['data'][0]['num_upcoming_shows'] == 4
+
+    rest = client.get(first['next']).get_json()
+    assert [venue['id'] for venue in rest['data']] == [3]
+    assert rest['next_cursor'] is None and rest['next'] is None
+
+
+@pytest.mark.parametrize('kind', ('venues', 'artists'))
+def test_detail(client, add_rows, kind):
+    detail = client.get(f'/api/v1/{kind}/1').get_json()
+    assert detail['id'] == 1
+    assert (detail['upcoming_shows_count'], detail['past_shows_count']) == (2, 2)
+    assert detail['num_upcoming_shows'] == len(detail['upcoming_shows']) == 2
+
+
+def test_fields(client, add_rows):
+    response = client.get('/api/v1/artists/1', query_string={'fields': 'id, name'})
+    assert response.get_json() == {'id': 1, 'name': 'Artist 1'}
+
+    unknown = client.get('/api/v1/artists', query_string={'fields': 'id,password'})
+    assert unknown.status_code == 400
+    assert unknown.get_json()['message'].startswith('Unknown fields password')
+
+
+def test_shows(app, client, add_rows):
+    month = client.get('/api/v1/shows', query_string={'when': 'month', 'fields': 'id,venue_name'}).get_json()
+    assert len(month['data']) == 2
+    assert month['data'][0]['venue_name'] == 'Venue 1'
+
+    with app.app_context():
+        show_id = db.session.query(Show.id).order_by(Show.id).first()[0]
+    show = client.get(f'/api/v1/shows/{show_id}').get_json()
+    assert (show['id'], show['venue_id'], show['artist_id']) == (show_id, 1, 1)
+
+
+def test_search(client, add_rows):
+    found = client.get('/api/v1/artists/search', query_string={'q': 'artist', 'fields': 'id,name'}).get_json()
+    assert found == {'data': [{'id': 1, 'name': 'Artist 1'}], 'count': 1}
+
+
+@pytest.mark.parametrize('url', ('/api/v1/venues/99', '/api/v1/shows/999'))
+def test_not_found(client, add_rows, url):
+    response = client.get(url)
+    assert response.status_code == 404
+    assert response.get_json()['error'] == 'Not Found'
@@ -0,0 +1,103 @@
+#----------------------------------------------------------------------------#
+# The ASGI app (asgi.py).
+#
+# The read pages run as greenlets on one event loop and query through
+# aiosqlite. Nothing they do may block the loop's thread: a request that
+# waits on a lock another request's greenlet holds stalls every request.
+# Each test runs the loop in a thread of its own, so a stalled loop fails
+# the test instead of hanging the run.
+#----------------------------------------------------------------------------#
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as fyyur
+from asgi import AsyncReads
+from models import Artist, Genre, Show, Venue, db, genre_lookup, name_indexes
+
+
+TIMEOUT = 10
+
+
+@pytest.fixture
+def async_app(tmp_path):
+    # the async bind opens connections of its own, so the database is a
+    # file both engines can see
+    app = fyyur.create_app(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'fyyur.db'}",
+        ASYNC_READS=True,
+        JOB_QUEUE_PATH=str(tmp_path / 'async-jobs.sqlite3'),
+        JOB_WORKERS=0,
+        CACHE_BACKEND=None,
+        TEMPLATE_WARMUP=False,
+    )
+    with app.app_context():
+        # the 'async' bind reaches the same file
+        db.create_all(bind_key=None)
+        db.session.add_all([Genre(name='Jazz'), Genre(name='Folk')])
+        db.session.add(Venue(name='The Jazz Hall', city='San Francisco', state='CA'))
+        db.session.add(Artist(name='Guns N Petals', city='Austin', state='TX'))
+        db.session.flush()
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime.now() + timedelta(days=1)))
+        db.session.commit()
+    genre_lookup.invalidate()
+    name_indexes.clear()
+    yield AsyncReads(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+async def get(app, path, query=''):
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(),
+        'headers': [], 'http_version': '1.1',
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]['status'], b''.join(message.get('body', b'') for message in messages[1:])
+
+
+def run_on_loop(coroutine):
+    result = {}
+
+    def run():
+        result['value'] = asyncio.run(coroutine)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    assert not thread.is_alive(), f'the event loop stalled for {TIMEOUT}s'
+    return result['value']
+
+
+async def get_concurrently(app, *requests):
+    return await asyncio.gather(*(get(app, *request) for request in requests))
+
+
+def test_read_page(async_app):
+    status, body = run_on_loop(get(async_app, '/venues'))
+    assert status == 200
+    assert b'The Jazz Hall' in body
+
+
+def test_concurrent_genre_loads(async_app):
+    # both requests load the genre maps, whose query awaits aiosqlite
+    responses = run_on_loop(get_concurrently(async_app, ('/shows',), ('/shows', 'genre=jazz')))
+    assert [status for status, _ in responses] == [200, 200]
+
+
+def test_concurrent_detail_pages(async_app):
+    responses = run_on_loop(get_concurrently(async_app, ('/api/v1/venues/1',), ('/api/v1/artists/1',)))
+    assert [status for status, _ in responses] == [200, 200]
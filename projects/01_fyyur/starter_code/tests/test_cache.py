@@ -0,0 +1,56 @@
+#----------------------------------------------------------------------------#
+# The response cache (cache.py) and what evicts its pages.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from commands import rebuild_show_counters_command
+from models import Show, Venue, db
+
+
+@pytest.fixture
+def settings():
+    return {'CACHE_BACKEND': 'memory'}
+
+
+@pytest.mark.parametrize('url', ('/venues', '/artists', '/shows', '/venues/1', '/artists/1'))
+def test_hit(client, add_rows, url):
+    assert client.get(url).headers['X-Cache'] == 'MISS'
+    second = client.get(url)
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.status_code == 200
+
+
+def test_query_string(client, add_rows):
+    client.get('/shows')
+    assert client.get('/shows', query_string={'when': 'week'}).headers['X-Cache'] == 'MISS'
+
+
+def test_new_show_evicts(app, client, add_rows):
+    # the commit refreshes the counters, which then evicts the listings
+    for url in ('/venues', '/shows'):
+        client.get(url)
+    with app.app_context():
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime.now() + timedelta(days=3)))
+        db.session.commit()
+        assert db.session.get(Venue, 1).upcoming_shows_count == 3
+    for url in ('/venues', '/shows'):
+        assert client.get(url).headers['X-Cache'] == 'MISS'
+
+
+def test_rebuild_command_evicts(app, client, add_rows):
+    # counters written behind the app's back, as when shows start
+    with app.app_context():
+        db.session.execute(db.update(Venue).values(upcoming_shows_count=99))
+        db.session.commit()
+    client.get('/venues')
+    assert client.get('/venues').headers['X-Cache'] == 'HIT'
+
+    result = app.test_cli_runner().invoke(rebuild_show_counters_command)
+    assert result.exit_code == 0
+    assert result.output.startswith('1 venue/artist counters')
+    assert client.get('/venues').headers['X-Cache'] == 'MISS'
+    with app.app_context():
+        assert db.session.get(Venue, 1).upcoming_shows_count == 2
@@ -0,0 +1,33 @@
+#----------------------------------------------------------------------------#
+# load_concurrently(), see database.py.
+#----------------------------------------------------------------------------#
+
+from flask import g
+
+from database import load_concurrently
+from models import Show, Venue, db
+
+
+def test_request_objects_stay_usable(app, add_rows):
+    with app.test_request_context('/venues/1'):
+        app.preprocess_request()
+        venue = db.session.get(Venue, 1)
+        load_concurrently(
+            lambda: Show.split_by_time(Show.venue_id == 1),
+            lambda: Show.split_by_time(Show.artist_id == 1),
+        )
+        # loaded before the loads ran, lazy loaded after
+        assert venue in db.session
+        assert len(venue.shows) == 4
+
+
+def test_loads_are_counted_and_fingerprinted(app, add_rows):
+    with app.test_request_context('/venues/1'):
+        app.preprocess_request()
+        load_concurrently(
+            lambda: Show.split_by_time(Show.venue_id == 1),
+            lambda: Show.split_by_time(Show.venue_id == 2),
+        )
+        assert g.request_stats['queries'] == 2
+        # the same statement from both loads, under one fingerprint
+        assert [count for count, _ in g.query_fingerprints.values()] == [2]
@@ -0,0 +1,64 @@
+#----------------------------------------------------------------------------#
+# Conditional GETs of the venue and artist pages (helpers.conditional), on
+# top of the response cache.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Artist, Show, Venue, db
+
+
+@pytest.fixture
+def settings():
+    return {'CACHE_BACKEND': 'memory'}
+
+
+@pytest.mark.parametrize('url', ('/venues/1', '/artists/1'))
+def test_not_modified(client, add_rows, url):
+    page = client.get(url)
+    assert page.status_code == 200 and page.headers['ETag']
+
+    again = client.get(url, headers={'If-None-Match': page.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == page.headers['ETag']
+    assert again.get_data() == b''
+
+    since = client.get(url, headers={'If-Modified-Since': page.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+@pytest.mark.parametrize('model, url', ((Venue, '/venues/1'), (Artist, '/artists/1')))
+def test_changed_without_eviction(app, client, add_rows, model, url):
+    # a write this process never hears of, e.g. from another worker with
+    # its own memory cache: the page's tag is not evicted, but the body
+    # must still match its new ETag
+    page = client.get(url)
+    assert client.get(url).headers['X-Cache'] == 'HIT'
+    with app.app_context():
+        db.session.execute(db.update(model).where(model.id == 1).values(name='Renamed', version=model.version + 1))
+        db.session.commit()
+
+    changed = client.get(url, headers={'If-None-Match': page.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != page.headers['ETag']
+    assert changed.headers['X-Cache'] == 'MISS'
+    assert b'Renamed' in changed.get_data()
+
+    again = client.get(url, headers={'If-None-Match': changed.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_started_show(app, client, add_rows):
+    # a show moving from upcoming to past changes the page without a write
+    page = client.get('/venues/1')
+    with app.app_context():
+        show = db.session.query(Show).filter(Show.venue_id == 1, Show.start_time > datetime.now()).first()
+        db.session.execute(db.update(Show).where(Show.id == show.id).values(
+            start_time=datetime.now() - timedelta(minutes=1)
+        ))
+        db.session.commit()
+    changed = client.get('/venues/1', headers={'If-None-Match': page.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.headers['X-Cache'] == 'MISS'
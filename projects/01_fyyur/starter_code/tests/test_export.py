@@ -0,0 +1,73 @@
+#----------------------------------------------------------------------------#
+# Streaming export (exporter.py), through GET /export/<kind> and the
+# export-data command.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+
+import pytest
+
+from commands import export_data_command
+from exporter import export_chunks
+from models import Show, db
+
+
+@pytest.fixture
+def settings():
+    return {'EXPORT_BATCH_SIZE': 2}
+
+
+def test_chunk_per_batch(app, add_rows):
+    add_rows(4)
+    with app.app_context():
+        chunks = list(export_chunks('venues', 'ndjson', batch_size=2))
+    # five venues, two rows a chunk
+    assert [chunk.count('\n') for chunk in chunks] == [2, 2, 1]
+
+
+def test_csv(client, add_rows):
+    add_rows(2)
+    response = client.get('/export/venues', buffered=False)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=venues.csv'
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['name'] for row in rows] == ['Venue 1', 'Venue 2', 'Venue 3']
+    # bookkeeping columns stay out, the importer's field names stay in
+    assert 'version' not in rows[0] and 'upcoming_shows_count' not in rows[0]
+    assert rows[0]['city'] == 'San Francisco'
+
+
+def test_ndjson_shows(app, client, add_rows):
+    response = client.get('/export/shows', query_string={'format': 'ndjson'})
+    assert response.mimetype == 'application/x-ndjson'
+    shows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    with app.app_context():
+        expected = db.session.query(Show).order_by(Show.id).all()
+    assert [show['id'] for show in shows] == [show.id for show in expected]
+    assert shows[0]['start_time'] == expected[0].start_time.isoformat()
+
+
+def test_genre_associations(client, add_rows):
+    rows = list(csv.reader(io.StringIO(client.get('/export/artist_genres').get_data(as_text=True))))
+    assert rows == [['artist_id', 'genre'], ['1', 'Folk'], ['1', 'Jazz']]
+
+
+@pytest.mark.parametrize('query', ({'format': 'xml'}, {}))
+def test_invalid(client, add_rows, query):
+    kind = 'venues' if query else 'tickets'
+    response = client.get(f'/export/{kind}', query_string=query)
+    assert response.status_code == 400
+    assert 'Unknown' in response.get_json()['error']
+
+
+def test_command(app, add_rows, tmp_path):
+    output = tmp_path / 'artists.ndjson'
+    result = app.test_cli_runner().invoke(export_data_command, ['artists', str(output), '--format', 'ndjson'])
+    assert result.exit_code == 0
+    artists = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [artist['name'] for artist in artists] == ['Artist 1']
@@ -0,0 +1,33 @@
+#----------------------------------------------------------------------------#
+# The template filters of app.py.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+import babel.dates
+import pytest
+
+from app import DATETIME_LOCALE, format_datetime
+
+
+MOMENT = datetime(2019, 5, 21, 21, 30)
+
+
+@pytest.mark.parametrize('format, pattern', (
+    ('full', "EEEE MMMM, d, y 'at' h:mma"),
+    ('medium', 'EE MM, dd, y h:mma'),
+    ('yyyy-MM-dd', 'yyyy-MM-dd'),
+))
+def test_patterns(format, pattern):
+    assert format_datetime(MOMENT, format) == babel.dates.format_datetime(MOMENT, pattern, locale=DATETIME_LOCALE)
+
+
+@pytest.mark.parametrize('format', ('short', 'long'))
+def test_babel_formats(format):
+    # the locale's patterns, as babel.dates.format_datetime() renders them
+    assert format_datetime(MOMENT, format) == babel.dates.format_datetime(MOMENT, format, locale=DATETIME_LOCALE)
+
+
+@pytest.mark.parametrize('value', ('05/21/2019, 21:30', '2019-05-21T21:30:00.000Z', MOMENT))
+def test_values(value):
+    assert format_datetime(value, 'yyyy-MM-dd HH:mm') == '2019-05-21 21:30'
@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# The create and edit form submissions.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Artist, ArtistGenre, Show, Venue, db
+
+
+def test_create_show(app, client, add_rows):
+    start_time = (datetime.now() + timedelta(days=30)).replace(microsecond=0)
+    response = client.post('/shows/create', data={
+        'venue_id': '1', 'artist_id': '1', 'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.query(Show.id).filter_by(start_time=start_time).count() == 1
+
+
+def test_edit_artist(app, client, add_rows):
+    form = {
+        'name': 'Renamed', 'city': 'Austin', 'state': 'TX', 'phone': '', 'image_link': '',
+        'facebook_link': '', 'website': '', 'genres': '1', 'seeking_description': '',
+    }
+    assert client.post('/artists/1/edit', data=dict(form, seeking_venue='y')).status_code == 302
+    with app.app_context():
+        artist = db.session.get(Artist, 1)
+        assert (artist.name, artist.seeking_venue) == ('Renamed', True)
+
+    # an unchecked checkbox isn't posted
+    client.post('/artists/1/edit', data=form)
+    with app.app_context():
+        assert db.session.get(Artist, 1).seeking_venue is False
+
+
+VENUE = {
+    'name': 'The Blue Room', 'city': 'San Francisco', 'state': 'CA', 'address': '1 Main Street',
+    'phone': '', 'image_link': '', 'facebook_link': '',
+}
+ARTIST = {'name': 'New Artist', 'city': 'Austin', 'state': 'TX', 'phone': '', 'image_link': '', 'facebook_link': ''}
+
+
+@pytest.mark.parametrize('url, form, model', (('/venues/create', VENUE, Venue), ('/artists/create', ARTIST, Artist)))
+def test_create_with_genre_names(app, client, add_rows, url, form, model):
+    response = client.post(url, data=dict(form, genres=['Jazz', 'Folk']))
+    assert b'successfully listed' in response.get_data()
+    with app.app_context():
+        created = model.query.filter_by(name=form['name']).one()
+        assert sorted(genre.name for genre in created.genres) == ['Folk', 'Jazz']
+
+
+@pytest.mark.parametrize('url, form, model', (('/venues/create', VENUE, Venue), ('/artists/create', ARTIST, Artist)))
+def test_create_with_unknown_genre(app, client, add_rows, url, form, model):
+    # Blues is one of the form's choices, but not in the genres table
+    response = client.post(url, data=dict(form, genres=['Jazz', 'Blues']))
+    assert response.status_code == 200
+    assert b'Unknown genres: Blues' in response.get_data()
+    with app.app_context():
+        assert model.query.filter_by(name=form['name']).count() == 0
+
+
+@pytest.mark.parametrize('genre', ('99', 'Blues'))
+def test_edit_with_unknown_genre(app, client, add_rows, genre):
+    form = {
+        'name': 'Renamed', 'city': 'Austin', 'state': 'TX', 'phone': '', 'image_link': '',
+        'facebook_link': '', 'website': '', 'genres': ['1', genre], 'seeking_description': '',
+    }
+    response = client.post('/artists/1/edit', data=form)
+    assert response.status_code == 302
+    assert response.headers['Location'] == '/artists/1/edit'
+    with client.session_transaction() as session:
+        assert session['_flashes'] == [('message', f'Unknown genres: {genre}')]
+    with app.app_context():
+        assert db.session.get(Artist, 1).name == 'Artist 1'
+        assert db.session.query(ArtistGenre).filter_by(artist_id=1).count() == 2
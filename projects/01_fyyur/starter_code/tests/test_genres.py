@@ -0,0 +1,42 @@
+#----------------------------------------------------------------------------#
+# The process-wide genre maps (GenreLookup) and how they are invalidated.
+#----------------------------------------------------------------------------#
+
+from models import Genre, db, genre_lookup
+
+
+def test_reloaded_after_commit(app, add_rows):
+    with app.app_context():
+        assert set(genre_lookup.by_name()) == {'Jazz', 'Folk'}
+        db.session.add(Genre(name='Blues'))
+        db.session.flush()
+        # flushed but not committed: other readers must not reload yet
+        assert genre_lookup.loaded_at is not None
+        db.session.commit()
+        assert set(genre_lookup.by_name()) == {'Jazz', 'Folk', 'Blues'}
+
+
+def test_kept_after_rollback(app, add_rows):
+    with app.app_context():
+        genre_lookup.load()
+        version = genre_lookup.version
+        db.session.add(Genre(name='Blues'))
+        db.session.flush()
+        db.session.rollback()
+        assert set(genre_lookup.by_name()) == {'Jazz', 'Folk'}
+        assert genre_lookup.version == version
+
+
+def test_load_across_invalidate(app, add_rows, monkeypatch):
+    # rows read before an invalidation are served but not kept
+    with app.app_context():
+        query = db.session.query
+
+        def invalidated_query(*args):
+            genre_lookup.invalidate()
+            return query(*args)
+
+        monkeypatch.setattr(db.session, 'query', invalidated_query)
+        genre_lookup.invalidate()
+        assert set(genre_lookup.by_name()) == {'Jazz', 'Folk'}
+        assert genre_lookup.loaded_at is None
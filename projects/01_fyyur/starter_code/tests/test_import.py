@@ -0,0 +1,87 @@
+#----------------------------------------------------------------------------#
+# Bulk import (importer.py), through POST /import/<kind>.
+#----------------------------------------------------------------------------#
+
+import io
+import json
+
+import pytest
+
+from models import Show, Venue, db
+
+
+VENUES_CSV = '''name,city,state,address,phone,image_link,facebook_link,genres
+The Blue Room,San Francisco,CA,1 Main Street,,,https://www.facebook.com/blue,Jazz
+Broken Row,San Francisco,CA,2 Main Street,,,https://www.facebook.com/broken,Jazz|Folk
+No City,,CA,3 Main Street,,,https://www.facebook.com/nocity,Jazz
+The Green Room,Oakland,CA,4 Main Street,,,https://www.facebook.com/green,Folk
+'''
+
+
+@pytest.fixture
+def settings():
+    return {'IMPORT_BATCH_SIZE': 10}
+
+
+def post(client, kind, body, format='csv'):
+    response = client.post(f'/import/{kind}', query_string={'format': format}, data=body.encode())
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def reject(app, name):
+    # a row the database refuses, as Postgres does a value too long for
+    # its column or a violated constraint
+    with app.app_context():
+        db.session.execute(db.text(
+            'CREATE TRIGGER reject BEFORE INSERT ON "Venue" '
+            f"WHEN NEW.name = '{name}' BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        ))
+        db.session.commit()
+
+
+def venue_names(app):
+    with app.app_context():
+        return [name for (name,) in db.session.query(Venue.name).order_by(Venue.id)]
+
+
+def test_import_venues(app, client, add_rows):
+    report = post(client, 'venues', VENUES_CSV)
+    assert (report['inserted'], report['failed']) == (3, 1)
+    assert [error['line'] for error in report['errors']] == [4]
+    assert 'city' in report['errors'][0]['errors']
+    assert venue_names(app)[1:] == ['The Blue Room', 'Broken Row', 'The Green Room']
+
+
+def test_unknown_genre(app, client, add_rows):
+    report = post(client, 'venues', VENUES_CSV.replace('Jazz|Folk', 'Jazz|Blues'))
+    assert (report['inserted'], report['failed']) == (2, 2)
+    assert report['errors'][0] == {'line': 3, 'errors': {'genres': ['Unknown genres: Blues']}}
+    assert venue_names(app)[1:] == ['The Blue Room', 'The Green Room']
+
+
+def test_database_error_fails_its_row_only(app, client, add_rows):
+    reject(app, 'Broken Row')
+    report = post(client, 'venues', VENUES_CSV)
+    assert (report['inserted'], report['failed']) == (2, 2)
+    assert report['errors'][1] == {'line': 3, 'errors': {'database': ['rejected']}}
+    assert venue_names(app)[1:] == ['The Blue Room', 'The Green Room']
+
+
+def test_import_shows(app, client, add_rows):
+    rows = [
+        {'venue_id': 1, 'artist_id': 1, 'start_time': '2030-01-01 20:00:00'},
+        {'venue_id': 99, 'artist_id': 1, 'start_time': '2030-01-02 20:00:00'},
+        {'venue_id': 1, 'artist_id': 1, 'start_time': 'someday'},
+    ]
+    report = post(client, 'shows', '\n'.join(json.dumps(row) for row in rows), format='ndjson')
+    assert (report['inserted'], report['failed']) == (1, 2)
+    assert {error['line'] for error in report['errors']} == {2, 3}
+    with app.app_context():
+        assert db.session.get(Venue, 1).upcoming_shows_count == 3
+        assert db.session.query(Show).count() == 5
+
+
+def test_upload(client, add_rows):
+    response = client.post('/import/venues', data={'file': (io.BytesIO(VENUES_CSV.encode()), 'venues.csv')})
+    assert response.get_json()['inserted'] == 3
@@ -0,0 +1,129 @@
+#----------------------------------------------------------------------------#
+# The background job queue (jobs.py): retries, dead jobs and local tasks.
+#
+# The tests drive the queue by hand, claiming and finishing jobs as a
+# worker thread would.
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from commands import jobs_retry_command, jobs_status_command
+from jobs import jobs
+
+
+calls = []
+
+
+@jobs.task
+def failing_job(n):
+    calls.append(n)
+    raise RuntimeError(f'failed {n}')
+
+
+@jobs.task
+def flaky_job(n):
+    calls.append(n)
+    if len(calls) == 1:
+        raise RuntimeError('failed once')
+
+
+@jobs.task(local=True)
+def local_job():
+    calls.append(os.getpid())
+
+
+@pytest.fixture
+def settings():
+    return {'JOB_MAX_ATTEMPTS': 3, 'JOB_RETRY_DELAY': 60, 'JOB_SCHEDULE': {}}
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+def queued():
+    with jobs.transaction() as queue:
+        return queue.execute('SELECT task, attempts, run_at, owner FROM jobs ORDER BY id').fetchall()
+
+
+def make_due():
+    with jobs.transaction() as queue:
+        queue.execute('UPDATE jobs SET run_at = 0')
+
+
+def run_next_job():
+    id, task, args, attempts = jobs.claim()
+    jobs.finish(id, task, args, attempts + 1, jobs.run(task, json.loads(args), attempts))
+
+
+def test_failure_is_retried_with_backoff(app):
+    # outside a request the job runs inline, and only its failure is queued
+    jobs.submit(failing_job, 7)
+    assert calls == [7]
+    ((task, attempts, run_at, _),) = queued()
+    assert (task, attempts) == ('failing_job', 1)
+    assert run_at == pytest.approx(time.time() + 60, abs=5)
+    # not before its time
+    assert jobs.claim() is None
+
+    make_due()
+    run_next_job()
+    ((_, attempts, run_at, _),) = queued()
+    assert attempts == 2
+    assert run_at == pytest.approx(time.time() + 120, abs=5)
+
+
+def test_dead_after_max_attempts(app):
+    jobs.submit(failing_job, 7)
+    for _ in range(2):
+        make_due()
+        run_next_job()
+    assert calls == [7, 7, 7]
+    assert queued() == []
+    assert jobs.dead_count() == 1
+    with jobs.transaction() as queue:
+        task, args, attempts, error = queue.execute('SELECT task, args, attempts, error FROM dead_jobs').fetchone()
+    assert (task, json.loads(args), attempts) == ('failing_job', [7], 3)
+    assert 'RuntimeError: failed 7' in error
+
+    runner = app.test_cli_runner()
+    assert runner.invoke(jobs_status_command).output == '0 jobs queued, 1 dead\n'
+    assert runner.invoke(jobs_retry_command).output == '1 dead jobs queued again\n'
+    assert jobs.dead_count() == 0
+    assert [(task, attempts) for task, attempts, _, _ in queued()] == [('failing_job', 0)]
+
+
+def test_success_after_retry(app):
+    jobs.submit(flaky_job, 1)
+    make_due()
+    run_next_job()
+    assert calls == [1, 1]
+    assert queued() == []
+    assert jobs.dead_count() == 0
+
+
+def test_local_job_stays_in_its_process(app):
+    jobs.enqueue('local_job', [])
+    ((_, _, _, owner),) = queued()
+    assert owner == os.getpid()
+
+    # another live process owns it
+    with jobs.transaction() as queue:
+        queue.execute('UPDATE jobs SET owner = ?', (os.getppid(),))
+    assert jobs.claim() is None
+
+    # its owner has exited
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    with jobs.transaction() as queue:
+        queue.execute('UPDATE jobs SET owner = ?', (exited.pid,))
+    run_next_job()
+    assert calls == [os.getpid()]
+    assert queued() == []
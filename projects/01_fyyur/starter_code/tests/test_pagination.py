@@ -0,0 +1,71 @@
+#----------------------------------------------------------------------------#
+# Keyset pagination cursors, see paginate() in models.py.
+#----------------------------------------------------------------------------#
+
+import base64
+import json
+
+import pytest
+
+
+def cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize('url, count', (('/api/v1/venues', 6), ('/api/v1/shows', 24)))
+def test_next_page(client, add_rows, url, count):
+    add_rows(5)
+    ids, next_cursor = [], ''
+    while next_cursor is not None:
+        page = client.get(url, query_string={'limit': 4, 'cursor': next_cursor}).get_json()
+        ids += [item['id'] for item in page['data']]
+        next_cursor = page['next_cursor']
+    assert sorted(ids) == list(range(1, count + 1))
+
+
+@pytest.mark.parametrize('url', ('/venues', '/shows', '/api/v1/venues', '/api/v1/artists', '/api/v1/shows'))
+@pytest.mark.parametrize('value', (
+    'not base64!',
+    cursor([1, 2, 3, 4]),
+    cursor({'a': 1}),
+    cursor(['x', {'dt': 'tomorrow'}, 3]),
+    cursor([True]),
+))
+def test_malformed_cursor(client, add_rows, url, value):
+    assert client.get(url, query_string={'cursor': value}).status_code == 400
+
+
+@pytest.mark.parametrize('url, value', (
+    ('/venues', [1, 2]),
+    ('/venues', ['CA', 'San Francisco', '1']),
+    ('/api/v1/venues', ['1']),
+    ('/api/v1/venues', [1, 2]),
+    ('/shows', [1, 2]),
+    ('/api/v1/shows', ['2024-01-01', 1]),
+))
+def test_cursor_of_other_keys(client, add_rows, url, value):
+    assert client.get(url, query_string={'cursor': cursor(value)}).status_code == 400
+
+
+def test_null_sort_keys(app, add_rows):
+    # venues without a state or city sort first, and the pages after them
+    # still come
+    from models import Venue, db
+
+    add_rows(5)
+    with app.app_context():
+        db.session.add_all([
+            Venue(name='Nowhere', city=None, state=None),
+            Venue(name='Somewhere', city='Oakland', state=None),
+            Venue(name='Anywhere', city=None, state='CA'),
+        ])
+        db.session.commit()
+
+        ids, next_cursor = [], None
+        while True:
+            areas, next_cursor = Venue.get_page(next_cursor, 2)
+            ids += [venue['id'] for area in areas for venue in area['venues']]
+            if next_cursor is None:
+                break
+    assert ids[:3] == [7, 8, 9]
+    assert sorted(ids) == list(range(1, 10))
@@ -0,0 +1,34 @@
+#----------------------------------------------------------------------------#
+# Query counts of the read pages.
+#
+# Every listing, detail and API page must run the same number of queries
+# however many venues, artists, shows and genre tags there are; a page
+# that loads something per row fails here (see assert_constant_queries).
+#----------------------------------------------------------------------------#
+
+import pytest
+
+from query_detector import assert_constant_queries
+
+
+URLS = (
+    '/venues',
+    '/artists',
+    '/shows',
+    '/venues/1',
+    '/artists/1',
+    '/api/v1/venues',
+    '/api/v1/artists',
+    '/api/v1/shows',
+    '/api/v1/venues/1',
+    '/api/v1/artists/1',
+    '/api/v1/shows/1',
+    '/api/v1/venues/search?q=venue',
+    '/api/v1/artists/search?q=artist',
+)
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_constant_queries(client, add_rows, url):
+    assert client.get(url).status_code == 200
+    assert_constant_queries(client, url, lambda: add_rows(5))
@@ -0,0 +1,33 @@
+#----------------------------------------------------------------------------#
+# Name search, see search_by_name() in models.py and search.py.
+#----------------------------------------------------------------------------#
+
+from models import Venue, db, like_pattern
+
+
+def test_like_pattern_matches_wildcards_literally(app):
+    with app.app_context():
+        db.session.add_all([Venue(name=name) for name in ('100% Jazz', '1000 Oaks', 'Under_Ground', 'Underground')])
+        db.session.commit()
+
+        def names(term):
+            query = db.session.query(Venue.name).filter(Venue.name.ilike(like_pattern(term), escape='\\'))
+            return sorted(name for (name,) in query)
+
+        assert names('100%') == ['100% Jazz']
+        assert names('r_g') == ['Under_Ground']
+        assert names('%') == ['100% Jazz']
+
+
+def test_name_index_picks_up_other_writers(app, client, add_rows):
+    def found(term):
+        return [venue['name'] for venue in client.get(f'/api/v1/venues/search?q={term}').get_json()['data']]
+
+    assert found('Velvet') == []
+    with app.app_context():
+        # a bulk insert fires no mapper events, like a write by another process
+        db.session.execute(db.insert(Venue), [{'name': 'Velvet Room'}])
+        db.session.commit()
+    assert found('Velvet') == []
+    app.config['NAME_INDEX_TTL'] = 0
+    assert found('Velvet') == ['Velvet Room']
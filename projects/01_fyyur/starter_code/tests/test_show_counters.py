@@ -0,0 +1,94 @@
+#----------------------------------------------------------------------------#
+# The upcoming/past show counters of venues and artists, kept by the Show
+# events and the refresh job, and by the scheduled rebuild.
+#----------------------------------------------------------------------------#
+
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from jobs import jobs
+from models import Artist, Show, Venue, db
+
+
+def counters(app):
+    with app.app_context():
+        venues = db.session.query(Venue.id, Venue.upcoming_shows_count, Venue.past_shows_count)
+        artists = db.session.query(Artist.id, Artist.upcoming_shows_count, Artist.past_shows_count)
+        return (
+            {id: (upcoming, past) for id, upcoming, past in venues},
+            {id: (upcoming, past) for id, upcoming, past in artists},
+        )
+
+
+@pytest.fixture
+def rows(app, add_rows):
+    # venues and artists 1 and 2; venue 1 and artist 1 have 6 shows each,
+    # the others 2, half of them upcoming
+    add_rows(1)
+    assert counters(app) == ({1: (3, 3), 2: (1, 1)}, {1: (3, 3), 2: (1, 1)})
+
+
+def test_insert(app, rows):
+    with app.app_context():
+        db.session.add(Show(venue_id=2, artist_id=2, start_time=datetime.now() + timedelta(days=1)))
+        db.session.add(Show(venue_id=2, artist_id=1, start_time=datetime.now() - timedelta(days=1)))
+        db.session.commit()
+    assert counters(app) == ({1: (3, 3), 2: (2, 2)}, {1: (3, 4), 2: (2, 1)})
+
+
+def test_delete(app, rows):
+    with app.app_context():
+        show = db.session.query(Show).filter(Show.venue_id == 2, Show.start_time > datetime.now()).one()
+        db.session.delete(show)
+        db.session.commit()
+    assert counters(app) == ({1: (3, 3), 2: (0, 1)}, {1: (2, 3), 2: (1, 1)})
+
+
+def test_repoint(app, rows):
+    # both the old and the new venue and artist are recounted
+    with app.app_context():
+        show = db.session.query(Show).filter(
+            Show.venue_id == 2, Show.artist_id == 1, Show.start_time > datetime.now()
+        ).one()
+        show.venue_id, show.artist_id = 1, 2
+        db.session.commit()
+    assert counters(app) == ({1: (4, 3), 2: (0, 1)}, {1: (2, 3), 2: (2, 1)})
+
+
+def test_rollback(app, rows):
+    with app.app_context():
+        db.session.add(Show(venue_id=2, artist_id=2, start_time=datetime.now() + timedelta(days=1)))
+        db.session.flush()
+        db.session.rollback()
+    assert counters(app) == ({1: (3, 3), 2: (1, 1)}, {1: (3, 3), 2: (1, 1)})
+
+
+def run_next_job():
+    id, task, args, attempts = jobs.claim()
+    jobs.finish(id, task, args, attempts + 1, jobs.run(task, json.loads(args), attempts))
+    return task
+
+
+def test_scheduled_rebuild(app, rows):
+    # a show starting changes no row, only the hourly rebuild moves it
+    with app.app_context():
+        db.session.execute(db.update(Show).where(Show.venue_id == 2, Show.start_time > datetime.now()).values(
+            start_time=datetime.now() - timedelta(minutes=1)
+        ))
+        db.session.commit()
+    assert counters(app)[0][2] == (1, 1)
+
+    with jobs.transaction() as queue:
+        jobs.plan(queue, 'rebuild_all_show_counters', 0)
+        jobs.plan(queue, 'rebuild_all_show_counters', 0)
+    assert jobs.depth() == 1
+    assert run_next_job() == 'rebuild_all_show_counters'
+    assert counters(app) == ({1: (3, 3), 2: (0, 2)}, {1: (2, 4), 2: (1, 1)})
+
+    # and queued the next run
+    with jobs.transaction() as queue:
+        (run_at,) = queue.execute("SELECT run_at FROM jobs WHERE task = 'rebuild_all_show_counters'").fetchone()
+    assert run_at == pytest.approx(time.time() + app.config['JOB_SCHEDULE']['rebuild_all_show_counters'], abs=5)
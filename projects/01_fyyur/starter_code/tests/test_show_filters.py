@@ -0,0 +1,20 @@
+#----------------------------------------------------------------------------#
+# /shows filters, see show_filters() and Show.window() in models.py.
+#----------------------------------------------------------------------------#
+
+import pytest
+
+
+@pytest.mark.parametrize('query, count', (
+    ('genre=jazz', 4),
+    ('city=san francisco&state=ca', 4),
+    ('city=Austin', 0),
+    ('when=month', 2),
+))
+def test_filters(client, add_rows, query, count):
+    assert len(client.get(f'/api/v1/shows?{query}').get_json()['data']) == count
+
+
+@pytest.mark.parametrize('url', ('/shows?genre=Polka', '/api/v1/shows?genre=Polka', '/api/v1/shows?when=someday'))
+def test_unknown_filter_values(client, add_rows, url):
+    assert client.get(url).status_code == 400